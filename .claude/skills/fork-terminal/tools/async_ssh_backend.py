@@ -0,0 +1,390 @@
+"""
+Async SSH Backend for Fork Terminal
+
+Runs commands and AI agents on many SSH hosts concurrently from one event loop,
+using asyncssh instead of one paramiko connection per thread. Host configuration,
+credential resolution and command building are shared with ssh_backend.
+
+Usage:
+    backend = AsyncSSHBackend()
+    results = asyncio.run(backend.execute_many([
+        ("dgx-1", "nvidia-smi"),
+        ("dgx-2", "explain this repo", "claude"),
+    ]))
+"""
+
+import asyncio
+import shlex
+import sys
+from pathlib import Path
+from typing import Optional, List, Dict, Sequence
+
+# Add tools directory to path for imports
+tools_dir = Path(__file__).parent
+if str(tools_dir) not in sys.path:
+    sys.path.insert(0, str(tools_dir))
+
+from credential_resolver import CredentialResolver, CredentialNotFoundError
+from ssh_host_config import SSHHostConfigManager, SSHHostConfig
+from ssh_backend import (
+    PROMPT_FILE_THRESHOLD,
+    KEEPALIVE_INTERVAL,
+    GPU_QUERY_COMMAND,
+    SSHBackend,
+    GPUInfo,
+    _build_env_prefix,
+    _parse_gpu_csv,
+)
+
+
+class AsyncSSHBackend:
+    """Executes on SSH hosts concurrently over pooled asyncssh connections"""
+
+    def __init__(self, verbose: bool = True):
+        """
+        Initialize async SSH backend.
+
+        Args:
+            verbose: Print status messages
+        """
+        self.verbose = verbose
+        self.resolver = CredentialResolver()
+        self.config_manager = SSHHostConfigManager()
+        # Open connection per host, and a lock per host so concurrent jobs share one connect
+        self._connections: Dict[str, "asyncssh.SSHClientConnection"] = {}
+        self._connect_locks: Dict[str, asyncio.Lock] = {}
+        # Imported private keys per key path, shared by all connections using the key
+        self._keys: Dict[str, "asyncssh.SSHKey"] = {}
+        self._ensure_asyncssh_available()
+
+    def _ensure_asyncssh_available(self):
+        """Ensure asyncssh library is installed"""
+        try:
+            import asyncssh
+            self.asyncssh = asyncssh
+        except ImportError:
+            print("Async SSH backend not installed.")
+            print("\nTo use async SSH backend, install dependencies:")
+            print("  pip install asyncssh")
+            sys.exit(1)
+
+    def _load_key(self, key_path: Path) -> "asyncssh.SSHKey":
+        """
+        Import a private key, asking the keychain for a passphrase only if the key needs one.
+
+        Blocking (keychain lookup); called through asyncio.to_thread.
+
+        Args:
+            key_path: Path to the SSH private key
+
+        Returns:
+            Imported asyncssh key (cached per key path)
+
+        Raises:
+            ConnectionError: If the key is encrypted without a stored passphrase or cannot be parsed
+        """
+        cache_key = str(key_path)
+        key = self._keys.get(cache_key)
+        if key is not None:
+            return key
+
+        try:
+            key = self.asyncssh.read_private_key(cache_key)
+        except (self.asyncssh.KeyImportError, ValueError):
+            passphrase = SSHBackend._passphrases.get(cache_key)
+            if not passphrase:
+                passphrase = self.resolver.get_ssh_passphrase(key_path, verbose=self.verbose)
+            if not passphrase:
+                raise ConnectionError(
+                    f"SSH key {key_path} is encrypted but passphrase not found in keychain.\n"
+                    "Add passphrase to keychain with:\n"
+                    f"  ssh-add --apple-use-keychain {key_path}"
+                )
+            try:
+                key = self.asyncssh.read_private_key(cache_key, passphrase)
+            except (self.asyncssh.KeyImportError, ValueError) as e:
+                raise ConnectionError(f"Unsupported or invalid SSH key: {key_path} ({e})")
+            SSHBackend._passphrases[cache_key] = passphrase
+
+        self._keys[cache_key] = key
+        return key
+
+    async def _get_connection(self, host_config: SSHHostConfig) -> "asyncssh.SSHClientConnection":
+        """
+        Get or create an SSH connection for a host.
+
+        Args:
+            host_config: Host configuration
+
+        Returns:
+            Connected asyncssh connection (pooled)
+        """
+        host_key = SSHBackend._host_key(host_config)
+        lock = self._connect_locks.setdefault(host_key, asyncio.Lock())
+
+        async with lock:
+            conn = self._connections.get(host_key)
+            if conn is not None and not conn.is_closed():
+                return conn
+
+            try:
+                key_path, _ = await asyncio.to_thread(
+                    self.resolver.get_ssh_key_path,
+                    explicit_path=None,
+                    host_config_path=host_config.key_path,
+                    verbose=self.verbose
+                )
+            except CredentialNotFoundError as e:
+                raise ConnectionError(f"SSH key not found: {e}")
+            key = await asyncio.to_thread(self._load_key, key_path)
+
+            if self.verbose:
+                print(f"Connecting to {host_config.user}@{host_config.hostname}...")
+
+            # known_hosts is left at its default (~/.ssh/known_hosts), so unknown hosts are rejected
+            try:
+                conn = await self.asyncssh.connect(
+                    host_config.hostname,
+                    port=host_config.port,
+                    username=host_config.user,
+                    client_keys=[key],
+                    keepalive_interval=KEEPALIVE_INTERVAL,
+                )
+            except (self.asyncssh.Error, OSError) as e:
+                raise ConnectionError(f"SSH connection failed: {e}")
+
+            self._connections[host_key] = conn
+            if self.verbose:
+                print(f"Connected to {host_config.hostname}")
+            return conn
+
+    async def _close_connection(self, host_config: SSHHostConfig):
+        """Close connection for a host"""
+        conn = self._connections.pop(SSHBackend._host_key(host_config), None)
+        if conn is not None:
+            conn.close()
+            await conn.wait_closed()
+
+    async def close_all_connections(self):
+        """Close all pooled connections"""
+        connections = list(self._connections.values())
+        self._connections.clear()
+        for conn in connections:
+            conn.close()
+        await asyncio.gather(*(conn.wait_closed() for conn in connections), return_exceptions=True)
+
+    async def detect_gpus(self, host_config: SSHHostConfig) -> List[GPUInfo]:
+        """
+        Detect GPUs on a remote host with nvidia-smi.
+
+        Args:
+            host_config: Host configuration
+
+        Returns:
+            List of GPUInfo objects (empty if no GPUs or nvidia-smi unavailable)
+        """
+        try:
+            conn = await self._get_connection(host_config)
+            completed = await conn.run(GPU_QUERY_COMMAND, check=False, timeout=30)
+        except Exception as e:
+            if self.verbose:
+                print(f"  GPU detection failed: {e}")
+            return []
+        if completed.exit_status != 0:
+            return []
+        return _parse_gpu_csv(completed.stdout or "")
+
+    async def _upload_prompt(self, conn: "asyncssh.SSHClientConnection", prompt: str) -> Optional[str]:
+        """
+        Write a long prompt to a remote temp file.
+
+        Args:
+            conn: Connected asyncssh connection
+            prompt: Prompt text
+
+        Returns:
+            Remote file path, or None if the upload failed
+        """
+        try:
+            completed = await conn.run(
+                "f=$(mktemp /tmp/fork-terminal-prompt-XXXXXXXX.txt) && cat > \"$f\" && echo \"$f\"",
+                input=prompt,
+                check=False,
+                timeout=30
+            )
+        except Exception:
+            return None
+        if completed.exit_status != 0:
+            return None
+        return completed.stdout.strip() or None
+
+    async def execute(
+        self,
+        host_name: str,
+        prompt: str,
+        agent: Optional[str] = None,
+        model: Optional[str] = None,
+        auto_close: bool = False
+    ) -> dict:
+        """
+        Execute a command or AI agent on a remote SSH host.
+
+        Args:
+            host_name: Name of configured SSH host
+            prompt: The command or prompt to execute
+            agent: Agent name ("claude", "gemini", "codex") or None for raw command
+            model: Optional model override for agents
+            auto_close: Close connection after execution
+
+        Returns:
+            Dictionary with execution results (same shape as SSHBackend.execute)
+        """
+        result = {
+            "success": False,
+            "output": "",
+            "error": None,
+            "host": host_name,
+            "gpu_info": [],
+            "files_transferred": []
+        }
+
+        host_config = self.config_manager.get_host(host_name)
+        if not host_config:
+            result["error"] = f"SSH host '{host_name}' not configured.\n"
+            result["error"] += f"Add it to: {self.config_manager.config_path}"
+            return result
+
+        try:
+            if self.verbose:
+                print(f"\nSSH Execution on {host_name}")
+                print(f"  Host: {host_config.user}@{host_config.hostname}:{host_config.port}")
+
+            conn = await self._get_connection(host_config)
+
+            # GPU detection (remote round trip) and credential lookup (local keychain)
+            # are independent, so run them concurrently
+            gpu_task = asyncio.ensure_future(self.detect_gpus(host_config)) if host_config.gpu_enabled else None
+            cred_task = (
+                asyncio.ensure_future(asyncio.to_thread(self.resolver.get_credential, agent, verbose=False))
+                if agent else None
+            )
+
+            if gpu_task:
+                result["gpu_info"] = await gpu_task
+                if result["gpu_info"] and self.verbose:
+                    print(f"  [{host_name}] GPUs detected: {len(result['gpu_info'])}")
+
+            env = dict(host_config.environment)
+            if host_config.cuda_path:
+                existing_path = env.get("PATH", "$PATH")
+                env["PATH"] = f"{host_config.cuda_path}/bin:{existing_path}"
+                env["LD_LIBRARY_PATH"] = f"{host_config.cuda_path}/lib64:$LD_LIBRARY_PATH"
+
+            if agent:
+                try:
+                    api_key = await cred_task
+                except CredentialNotFoundError as e:
+                    result["error"] = str(e)
+                    return result
+
+                env[self.resolver.AGENT_KEY_MAP[agent]] = api_key
+                if agent == "codex":
+                    env["OPENAI_API_KEY"] = api_key
+
+                prompt_file = None
+                if len(prompt) > PROMPT_FILE_THRESHOLD:
+                    prompt_file = await self._upload_prompt(conn, prompt)
+
+                command = SSHBackend._build_agent_command(agent, prompt, model, prompt_file=prompt_file)
+                if prompt_file:
+                    command = f"{command}; status=$?; rm -f {shlex.quote(prompt_file)}; exit $status"
+            else:
+                command = prompt
+
+            if self.verbose:
+                print(f"  [{host_name}] Executing...")
+
+            completed = await conn.run(_build_env_prefix(env) + command, check=False, timeout=300)
+
+            result["success"] = completed.exit_status == 0
+            result["output"] = completed.stdout or ""
+            if completed.stderr:
+                result["error"] = completed.stderr
+
+            if self.verbose:
+                print(f"  [{host_name}] Exit code: {completed.exit_status}")
+
+        except Exception as e:
+            result["error"] = f"SSH execution failed: {str(e)}"
+            if self.verbose:
+                print(f"  [{host_name}] Error: {e}")
+
+        finally:
+            if auto_close:
+                await self._close_connection(host_config)
+
+        return result
+
+    async def execute_many(self, jobs: Sequence[Sequence]) -> List[dict]:
+        """
+        Execute jobs on several hosts concurrently.
+
+        Args:
+            jobs: (host_name, prompt[, agent[, model]]) tuples
+
+        Returns:
+            Result dictionaries in the same order as jobs
+        """
+        return await asyncio.gather(*(self.execute(*job) for job in jobs))
+
+
+def execute_on_ssh_hosts(
+    host_names: Sequence[str],
+    prompt: str,
+    agent: Optional[str] = None,
+    verbose: bool = True
+) -> List[dict]:
+    """
+    Convenience function to run the same command or prompt on several SSH hosts.
+
+    Args:
+        host_names: Names of configured SSH hosts
+        prompt: Command or prompt to execute
+        agent: Optional agent name
+        verbose: Print status messages
+
+    Returns:
+        Execution result dictionaries, one per host
+    """
+    async def run() -> List[dict]:
+        backend = AsyncSSHBackend(verbose=verbose)
+        try:
+            return await backend.execute_many([(host, prompt, agent) for host in host_names])
+        finally:
+            await backend.close_all_connections()
+
+    return asyncio.run(run())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python async_ssh_backend.py <host1,host2,...> <command>")
+        print("       python async_ssh_backend.py <host1,host2,...> --agent <agent> <prompt>")
+        sys.exit(1)
+
+    hosts = [h for h in sys.argv[1].split(",") if h]
+    agent = None
+    prompt_args = sys.argv[2:]
+    if "--agent" in prompt_args:
+        idx = prompt_args.index("--agent")
+        if idx + 1 < len(prompt_args):
+            agent = prompt_args[idx + 1]
+            prompt_args = prompt_args[:idx] + prompt_args[idx + 2:]
+
+    for result in execute_on_ssh_hosts(hosts, " ".join(prompt_args), agent=agent):
+        print("\n" + "=" * 60)
+        print(f"Host: {result['host']}  Success: {result['success']}")
+        if result['output']:
+            print(f"\nOutput:\n{result['output']}")
+        if result['error']:
+            print(f"\nError:\n{result['error']}")
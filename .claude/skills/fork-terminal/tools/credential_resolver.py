@@ -19,8 +19,9 @@ import os
 import sys
 import json
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Dict, Iterable, Union
 
 
 class CredentialNotFoundError(Exception):
@@ -98,7 +99,69 @@ class CredentialResolver:
             return credential
 
         # Not found in any source
-        raise CredentialNotFoundError(
+        raise self._not_found(agent, key_name)
+
+    def get_credentials(self, agents: Iterable[str]) -> Dict[str, Union[str, Exception]]:
+        """
+        Resolve several agents' credentials with one pass over each source.
+
+        Same waterfall as get_credential(), but the .env file is read once for
+        all agents instead of once per agent, and the keychain/config file lookups
+        for different agents run concurrently.
+
+        Args:
+            agents: Agent names ("claude", "gemini", "codex", "e2b")
+
+        Returns:
+            Dictionary mapping each agent to its credential, or to the exception
+            get_credential() would have raised (ValueError / CredentialNotFoundError)
+        """
+        agents = list(agents)
+        results: Dict[str, Union[str, Exception]] = {}
+        pending: Dict[str, str] = {}
+        for agent in agents:
+            key_name = self.AGENT_KEY_MAP.get(agent)
+            if not key_name:
+                results[agent] = ValueError(
+                    f"Unknown agent: {agent}. "
+                    f"Supported: {', '.join(self.AGENT_KEY_MAP.keys())}"
+                )
+                continue
+            # 1. Environment variable
+            credential = os.getenv(key_name)
+            if credential:
+                results[agent] = credential
+            else:
+                pending[agent] = key_name
+
+        # 2. .env file (read once)
+        if pending:
+            env_values = self._read_env_file()
+            for agent, key_name in list(pending.items()):
+                if env_values.get(key_name):
+                    results[agent] = env_values[key_name]
+                    del pending[agent]
+
+        # 3. System keychain, 4. tool-specific config files; each lookup spawns
+        # a subprocess or reads files, so the remaining agents are looked up concurrently
+        def lookup(item: Tuple[str, str]) -> Optional[str]:
+            agent, key_name = item
+            return self._get_from_keychain(key_name) or self._get_from_config_file(agent, key_name)
+
+        if len(pending) > 1:
+            with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+                found = list(executor.map(lookup, pending.items()))
+        else:
+            found = [lookup(item) for item in pending.items()]
+
+        for (agent, key_name), credential in zip(pending.items(), found):
+            results[agent] = credential if credential else self._not_found(agent, key_name)
+
+        return {agent: results[agent] for agent in agents}
+
+    def _not_found(self, agent: str, key_name: str) -> CredentialNotFoundError:
+        """Build the error for a credential missing from every source"""
+        return CredentialNotFoundError(
             f"Credential not found for {agent} ({key_name}).\n"
             f"Checked:\n"
             f"  1. Environment variable: ${key_name}\n"
@@ -139,9 +202,14 @@ class CredentialResolver:
 
     def _get_from_env_file(self, key_name: str) -> Optional[str]:
         """Get credential from .env file in current directory"""
+        return self._read_env_file().get(key_name)
+
+    def _read_env_file(self) -> Dict[str, str]:
+        """Read every KEY=value credential from .env in the current directory"""
+        values: Dict[str, str] = {}
         env_path = Path(".env")
         if not env_path.exists():
-            return None
+            return values
 
         try:
             with open(env_path) as f:
@@ -151,22 +219,24 @@ class CredentialResolver:
                     if not line or line.startswith("#"):
                         continue
                     # Check for key=value format
-                    if line.startswith(f"{key_name}="):
-                        value = line.split("=", 1)[1].strip()
-                        # Remove quotes if present
-                        if value.startswith('"') and value.endswith('"'):
-                            value = value[1:-1]
-                        if value.startswith("'") and value.endswith("'"):
-                            value = value[1:-1]
-                        # Don't return placeholder values
-                        if "your_" in value.lower() or "_here" in value.lower():
-                            continue
-                        return value
+                    key, sep, value = line.partition("=")
+                    if not sep or key in values:
+                        continue
+                    value = value.strip()
+                    # Remove quotes if present
+                    if value.startswith('"') and value.endswith('"'):
+                        value = value[1:-1]
+                    if value.startswith("'") and value.endswith("'"):
+                        value = value[1:-1]
+                    # Don't return placeholder values
+                    if "your_" in value.lower() or "_here" in value.lower():
+                        continue
+                    values[key] = value
         except Exception:
             # Silently fail and try next source
             pass
 
-        return None
+        return values
 
     def _get_from_config_file(self, agent: str, key_name: str) -> Optional[str]:
         """Get credential from tool-specific config file"""
@@ -209,14 +279,10 @@ class CredentialResolver:
         Returns:
             Dictionary mapping agent names to availability (True/False)
         """
-        available = {}
-        for agent in self.AGENT_KEY_MAP.keys():
-            try:
-                self.get_credential(agent, verbose=False)
-                available[agent] = True
-            except CredentialNotFoundError:
-                available[agent] = False
-        return available
+        return {
+            agent: isinstance(credential, str)
+            for agent, credential in self.get_credentials(self.AGENT_KEY_MAP.keys()).items()
+        }
 
     # SSH Key Resolution Methods
 
@@ -6,6 +6,7 @@ import platform
 import subprocess
 import sys
 from pathlib import Path
+from typing import Optional
 
 # Add tools directory to path for imports
 tools_dir = Path(__file__).parent
@@ -198,6 +199,35 @@ def _execute_in_docker(agent: str, command: str, auto_close: bool, working_dir:
 
 import re
 import shlex
+from functools import lru_cache
+
+# Command keyword patterns, compiled once
+_AUTO_CLOSE_RE = re.compile(r"^(auto-close|--auto-close)\s*|\s*(auto-close|--auto-close)$", re.IGNORECASE)
+_SANDBOX_RE = re.compile(r"\s*(in sandbox|sandbox:|use sandbox|with sandbox)\s*", re.IGNORECASE)
+_DOCKER_RE = re.compile(r"\s*(in docker|docker:|use docker|with docker)\s*", re.IGNORECASE)
+_AGENT_RE = re.compile(r"(use\s+)?(claude-code|claude\s+code|claude|gemini|codex)", re.IGNORECASE)
+
+
+@lru_cache(maxsize=16)
+def _ssh_host_patterns(configured_hosts: tuple) -> tuple:
+    """
+    Compiled SSH host patterns for a set of configured hosts.
+
+    Args:
+        configured_hosts: Configured SSH host names
+
+    Returns:
+        ("on <host>", "ssh to <host>", "remote:<host>", "@<host>") compiled patterns
+    """
+    # Build pattern for known hosts
+    hosts_pattern = "|".join(re.escape(h) for h in configured_hosts)
+    return (
+        # Use (?:^|\s+) to match at start of string OR after whitespace
+        re.compile(rf"(?:^|\s+)on\s+({hosts_pattern})\b", re.IGNORECASE),
+        re.compile(rf"\s*ssh\s+to\s+({hosts_pattern})\b", re.IGNORECASE),
+        re.compile(rf"\s*remote:({hosts_pattern})\b", re.IGNORECASE),
+        re.compile(rf"^@({hosts_pattern})\s+", re.IGNORECASE),
+    )
 
 
 def _get_configured_ssh_hosts() -> list:
@@ -233,14 +263,12 @@ def parse_command(command: str) -> dict:
     cmd = result["command"]
 
     # 1. Detect and strip auto-close
-    auto_close_pattern = r"^(auto-close|--auto-close)\s*|\s*(auto-close|--auto-close)$"
-    if re.search(auto_close_pattern, cmd, re.IGNORECASE):
+    if _AUTO_CLOSE_RE.search(cmd):
         result["auto_close"] = True
-        cmd = re.sub(auto_close_pattern, "", cmd, flags=re.IGNORECASE).strip()
+        cmd = _AUTO_CLOSE_RE.sub("", cmd).strip()
 
     # 2. Detect E2B sandbox backend
-    sandbox_pattern = r"\s*(in sandbox|sandbox:|use sandbox|with sandbox)\s*"
-    sandbox_match = re.search(sandbox_pattern, cmd, re.IGNORECASE)
+    sandbox_match = _SANDBOX_RE.search(cmd)
     if sandbox_match:
         result["backend"] = "e2b"
         # Remove the backend keyword from the command
@@ -248,8 +276,7 @@ def parse_command(command: str) -> dict:
 
     # 3. Detect Docker backend
     if result["backend"] == "local":
-        docker_pattern = r"\s*(in docker|docker:|use docker|with docker)\s*"
-        docker_match = re.search(docker_pattern, cmd, re.IGNORECASE)
+        docker_match = _DOCKER_RE.search(cmd)
         if docker_match:
             result["backend"] = "docker"
             cmd = cmd[:docker_match.start()] + cmd[docker_match.end():]
@@ -259,13 +286,10 @@ def parse_command(command: str) -> dict:
     configured_hosts = _get_configured_ssh_hosts()
 
     if configured_hosts and result["backend"] == "local":
-        # Build pattern for known hosts
-        hosts_pattern = "|".join(re.escape(h) for h in configured_hosts)
+        on_host_re, ssh_to_re, remote_re, at_host_re = _ssh_host_patterns(tuple(configured_hosts))
 
         # Pattern 1: "on <hostname>" (e.g., "on dgx")
-        # Use (?:^|\s+) to match at start of string OR after whitespace
-        on_host_pattern = rf"(?:^|\s+)on\s+({hosts_pattern})\b"
-        on_host_match = re.search(on_host_pattern, cmd, re.IGNORECASE)
+        on_host_match = on_host_re.search(cmd)
         if on_host_match:
             result["backend"] = "ssh"
             result["ssh_host"] = on_host_match.group(1).lower()
@@ -273,8 +297,7 @@ def parse_command(command: str) -> dict:
 
         # Pattern 2: "ssh to <hostname>" (e.g., "ssh to dgx")
         if not result["ssh_host"]:
-            ssh_to_pattern = rf"\s*ssh\s+to\s+({hosts_pattern})\b"
-            ssh_to_match = re.search(ssh_to_pattern, cmd, re.IGNORECASE)
+            ssh_to_match = ssh_to_re.search(cmd)
             if ssh_to_match:
                 result["backend"] = "ssh"
                 result["ssh_host"] = ssh_to_match.group(1).lower()
@@ -282,8 +305,7 @@ def parse_command(command: str) -> dict:
 
         # Pattern 3: "remote:<hostname>" (e.g., "remote:dgx")
         if not result["ssh_host"]:
-            remote_pattern = rf"\s*remote:({hosts_pattern})\b"
-            remote_match = re.search(remote_pattern, cmd, re.IGNORECASE)
+            remote_match = remote_re.search(cmd)
             if remote_match:
                 result["backend"] = "ssh"
                 result["ssh_host"] = remote_match.group(1).lower()
@@ -291,8 +313,7 @@ def parse_command(command: str) -> dict:
 
         # Pattern 4: "@<hostname>" at start (e.g., "@dgx ls -la")
         if not result["ssh_host"]:
-            at_host_pattern = rf"^@({hosts_pattern})\s+"
-            at_host_match = re.search(at_host_pattern, cmd, re.IGNORECASE)
+            at_host_match = at_host_re.search(cmd)
             if at_host_match:
                 result["backend"] = "ssh"
                 result["ssh_host"] = at_host_match.group(1).lower()
@@ -300,8 +321,7 @@ def parse_command(command: str) -> dict:
 
     # 4. Detect agent
     # Pattern to find "use <agent>" or just the agent name
-    agent_pattern = r"(use\s+)?(claude-code|claude\s+code|claude|gemini|codex)"
-    agent_match = re.search(agent_pattern, cmd, re.IGNORECASE)
+    agent_match = _AGENT_RE.search(cmd)
     if agent_match:
         agent_name = agent_match.group(2).lower().replace(" ", "-")
         result["agent"] = agent_name
@@ -318,6 +338,39 @@ def parse_command(command: str) -> dict:
     return result
 
 
+@lru_cache(maxsize=128)
+def _detect(command: str, configured_hosts: tuple) -> tuple:
+    """(backend, agent) for a command; cached per command and configured host set"""
+    parsed = parse_command(command)
+    return parsed["backend"], parsed["agent"]
+
+
+def detect_backend(command: str) -> str:
+    """
+    Detect which backend a command routes to.
+
+    Args:
+        command: The command string
+
+    Returns:
+        "local", "e2b", "docker" or "ssh"
+    """
+    return _detect(command, tuple(_get_configured_ssh_hosts()))[0]
+
+
+def detect_agent(command: str) -> Optional[str]:
+    """
+    Detect which AI agent a command asks for.
+
+    Args:
+        command: The command string
+
+    Returns:
+        Agent name (e.g. "claude", "gemini", "codex") or None for a raw command
+    """
+    return _detect(command, tuple(_get_configured_ssh_hosts()))[1]
+
+
 def fork_terminal(command: str) -> str:
     """Open a new Terminal window and run the specified command.
 
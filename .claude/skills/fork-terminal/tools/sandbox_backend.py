@@ -5,51 +5,510 @@ Provides isolated execution environment for AI agents using E2B sandboxes.
 Supports Claude Code, Gemini CLI, and Codex CLI in secure cloud containers.
 """
 
+import asyncio
+import atexit
+import hashlib
+import io
+import json
+import logging
 import os
 import sys
 import re
+import shlex
+import shutil
+import string
+import subprocess
+import tarfile
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Sequence, Tuple, Callable
 from credential_resolver import CredentialResolver, CredentialNotFoundError
 
+logger = logging.getLogger(__name__)
+
+# ASCII-only lowercasing keeps string length (and match offsets) identical to
+# the original prompt, which str.lower() does not guarantee for all of Unicode.
+_ASCII_LOWER_TABLE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+# File reference patterns, written for lowercased input (no re.IGNORECASE)
+_FILE_REF_PATTERNS = [
+    re.compile(r'(\.[a-z0-9_\-/]+\.(?:md|py|js|ts|tsx|jsx|json|yaml|yml|txt|csv|html|css|sh|bash))\b'),  # Paths starting with .
+    re.compile(r'\b([a-z0-9_\-/]+\.(?:md|py|js|ts|tsx|jsx|json|yaml|yml|txt|csv|html|css|sh|bash))\b'),  # Regular paths
+    re.compile(r'\b([a-z][a-z0-9_]+\.md)\b'),  # UPPERCASE.md files like SKILL.MD, README.MD
+    re.compile(r'\b(my\s+)?([a-z0-9_\-]+\.[a-z0-9]+)\b'),  # "my file.txt" pattern
+]
+
+# Python API libraries used by the fallback path (pre-installed in the AI template)
+PYTHON_API_PACKAGES = ("anthropic", "google-genai", "openai")
+
+# Local cache of Linux wheels for PYTHON_API_PACKAGES, one subdirectory per
+# sandbox Python version (e.g. ~/.cache/fork-terminal/wheels/py3.10)
+WHEELHOUSE_DIR = Path.home() / ".cache" / "fork-terminal" / "wheels"
+SANDBOX_WHEELHOUSE_DIR = "/tmp/wheels"  # nosec B108 - sandbox-side temp dir
+
+# Sandbox-side path prefix for batched (tar.gz) uploads; each upload adds a
+# unique suffix so concurrent runs in one sandbox don't clobber each other's bundle
+SANDBOX_BUNDLE_PREFIX = "/tmp/fork-terminal-bundle"  # nosec B108 - sandbox-side temp file
+
+
+@lru_cache(maxsize=None)
+def _load_template_id(template_type: str = "ai") -> Optional[str]:
+    """
+    Load E2B template ID from file if it exists
+
+    Cached per process so every SandboxBackend shares one read of the file.
+
+    Args:
+        template_type: "ai" for AI agents template, "base" for base template
+
+    Returns:
+        Template ID or None
+    """
+    if template_type == "ai":
+        template_file = Path(__file__).parent / ".e2b_template_id"
+    else:
+        template_file = Path(__file__).parent / ".e2b_template_id_base"
+
+    if template_file.exists():
+        template_id = template_file.read_text().strip()
+        if template_id:
+            return template_id
+
+    return None
+
+
+def _ensure_console_handler():
+    """Print status messages to stdout unless the application configured logging itself"""
+    if not logger.handlers and not logging.getLogger().handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+
+
+class SandboxBackendUnavailable(RuntimeError):
+    """Raised when the E2B SDK needed for sandbox execution is not installed"""
+
+
+def _shell_quote(value: str) -> str:
+    """
+    Quote a string for the sandbox shell.
+
+    Quote-free strings (almost every prompt and API key) are wrapped in single
+    quotes after one substring check, skipping shlex.quote's regex scan and
+    replace; anything else goes through shlex.quote.
+    """
+    if "'" not in value:
+        return f"'{value}'"
+    return shlex.quote(value)
+
+
+# CLI invocation per agent: (command prefix, accepts --model)
+_CLI_COMMANDS = {
+    # Claude Code CLI: claude code -p "prompt"
+    "claude": ("claude code -p", True),
+    # Gemini CLI: gemini -y -p "prompt"
+    # Note: -y (--yolo) flag required, -p flag deprecated but shows actual output
+    "gemini": ("gemini -y -p", True),
+    # Codex CLI non-interactive mode: codex exec "prompt"
+    # Use --full-auto for file modifications, --sandbox danger-full-access for full access,
+    # and --skip-git-repo-check since sandbox may not have git repo
+    "codex": ("codex exec --full-auto --sandbox danger-full-access --skip-git-repo-check", False),
+}
+
+# CLI executable per agent (what availability checks look for on PATH)
+_CLI_EXECUTABLES = {agent: prefix.split()[0] for agent, (prefix, _) in _CLI_COMMANDS.items()}
+
+
+# Python API fallback per agent: (default model, script template for str.format)
+_PYTHON_API_SCRIPTS = {
+    # Anthropic Python API
+    "claude": ("claude-3-5-sonnet-20241022", """import os, anthropic
+prompt = {prompt_literal}
+{file_reading_code}
+client = anthropic.Anthropic(api_key=os.environ['ANTHROPIC_API_KEY'])
+response = client.messages.create(
+    model={model_str},
+    max_tokens=4096,
+    messages=[{{'role': 'user', 'content': {prompt_var}}}]
+)
+print(response.content[0].text)
+"""),
+    # Google Genai Python API (new library)
+    "gemini": ("gemini-2.0-flash-exp", """import os
+from google import genai
+prompt = {prompt_literal}
+{file_reading_code}
+client = genai.Client(api_key=os.environ['GEMINI_API_KEY'])
+response = client.models.generate_content(
+    model={model_str},
+    contents={prompt_var}
+)
+print(response.text)
+"""),
+    # OpenAI Python API
+    "codex": ("gpt-4-turbo-preview", """import os
+from openai import OpenAI
+prompt = {prompt_literal}
+{file_reading_code}
+client = OpenAI(api_key=os.environ['OPENAI_API_KEY'])
+response = client.chat.completions.create(
+    model={model_str},
+    messages=[{{'role': 'user', 'content': {prompt_var}}}]
+)
+print(response.choices[0].message.content)
+"""),
+}
+
+
+@lru_cache(maxsize=32)
+def _cli_command_parts(agent: str, model: Optional[str]) -> Tuple[str, str]:
+    """
+    Fixed text around the quoted prompt in a CLI command, cached per (agent, model).
+
+    Args:
+        agent: Agent name
+        model: Optional model override
+
+    Returns:
+        (prefix, suffix) tuple; the command is prefix + quoted prompt + suffix
+    """
+    try:
+        base, takes_model = _CLI_COMMANDS[agent]
+    except KeyError:
+        raise ValueError(f"CLI not supported for agent: {agent}") from None
+    suffix = f" --model {model}" if model and takes_model else ""
+    return f"{base} ", suffix
+
+
+class SandboxPool:
+    """
+    Keeps idle E2B sandboxes for reuse across execute() calls.
+
+    Sandboxes are keyed by (template ID, E2B key hash) so different E2B
+    accounts never share a sandbox. Agent credentials are exported per command,
+    not baked into the sandbox, so pooled sandboxes are safe to reuse across
+    agents. Idle sandboxes older than idle_ttl (kept below E2B's default 300s
+    sandbox timeout) are dropped, and reused sandboxes are reset before being
+    handed out again.
+
+    Only sandboxes the pool created itself (prewarm()) are ever killed by it;
+    sandboxes a caller kept (auto_close=False) are left running when they are
+    dropped or the process exits, so they stay available to that caller.
+    """
+
+    # Sandbox state cleared before a pooled sandbox is reused; files uploaded by
+    # the previous run (tracked per release()) are removed as well
+    RESET_COMMAND = "rm -rf /home/user/output /home/user/run-* /tmp/ai_agent.py /tmp/fork-terminal-bundle*"
+
+    def __init__(self, idle_ttl: float = 240.0, max_idle: int = 4):
+        """
+        Initialize the pool
+
+        Args:
+            idle_ttl: Seconds an idle sandbox may stay in the pool
+            max_idle: Maximum idle sandboxes kept per template
+        """
+        self.idle_ttl = idle_ttl
+        self.max_idle = max_idle
+        # Per key: (released_at, sandbox, owned_by_pool, paths_written_by_last_run)
+        self._idle: Dict[Tuple[Optional[str], str], deque] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(template_id: Optional[str], e2b_key: str) -> Tuple[Optional[str], str]:
+        """
+        Build the pool key for a template and E2B API key
+
+        Args:
+            template_id: Template ID (None for the default E2B sandbox)
+            e2b_key: E2B API key (only a hash is kept)
+
+        Returns:
+            Pool key tuple
+        """
+        return template_id, hashlib.sha256(e2b_key.encode()).hexdigest()[:16]
+
+    def acquire(self, key: Tuple[Optional[str], str], create: Callable[[], object]) -> Tuple[object, bool]:
+        """
+        Get a sandbox for a pool key, reusing an idle one when possible
+
+        Args:
+            key: Pool key from make_key()
+            create: Factory called to create a sandbox when none is idle
+
+        Returns:
+            Tuple of (sandbox, reused)
+        """
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                if not idle:
+                    break
+                released_at, sandbox, owned, written = idle.pop()
+
+            if time.monotonic() - released_at <= self.idle_ttl and self._reset(sandbox, written):
+                return sandbox, True
+            if owned:
+                self._discard(sandbox)
+
+        return create(), False
+
+    def release(
+        self,
+        key: Tuple[Optional[str], str],
+        sandbox,
+        owned: bool = False,
+        written: Sequence[str] = ()
+    ) -> bool:
+        """
+        Return a sandbox to the pool
+
+        If the pool is full, a pool-owned sandbox is killed and a caller's
+        sandbox is left running outside the pool.
+
+        Args:
+            key: Pool key the sandbox was acquired with
+            sandbox: E2B sandbox instance
+            owned: True if the pool created the sandbox (prewarm) and may kill it
+            written: Sandbox paths the last run wrote, removed before reuse
+
+        Returns:
+            True if the sandbox was pooled
+        """
+        with self._lock:
+            idle = self._idle.setdefault(key, deque())
+            if len(idle) < self.max_idle:
+                idle.append((time.monotonic(), sandbox, owned, tuple(written)))
+                return True
+
+        if owned:
+            self._discard(sandbox)
+        return False
+
+    def prewarm(self, key: Tuple[Optional[str], str], create: Callable[[], object], count: int) -> threading.Thread:
+        """
+        Fill the pool in a background thread
+
+        Args:
+            key: Pool key from make_key()
+            create: Factory that creates one sandbox
+            count: Number of idle sandboxes to keep ready (capped at max_idle)
+
+        Returns:
+            The started filler thread
+        """
+        target = min(count, self.max_idle)
+
+        def fill():
+            while True:
+                with self._lock:
+                    if len(self._idle.get(key, ())) >= target:
+                        return
+                try:
+                    sandbox = create()
+                except Exception:
+                    return
+                if not self.release(key, sandbox, owned=True):
+                    return
+
+        thread = threading.Thread(target=fill, name="e2b-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    def close_all(self):
+        """Empty the pool, killing the idle sandboxes it created and leaving callers' sandboxes running"""
+        with self._lock:
+            owned = [entry[1] for queue in self._idle.values() for entry in queue if entry[2]]
+            self._idle.clear()
+
+        for sandbox in owned:
+            self._discard(sandbox)
+
+    def _reset(self, sandbox, written: Sequence[str] = ()) -> bool:
+        """Clear per-run state; False if the sandbox is no longer usable"""
+        command = self.RESET_COMMAND
+        if written:
+            command += " " + " ".join(shlex.quote(path) for path in written)
+        try:
+            return sandbox.commands.run(command, timeout=30).exit_code == 0
+        except Exception:
+            return False
+
+    @staticmethod
+    def _discard(sandbox):
+        """Kill a sandbox, ignoring errors"""
+        try:
+            sandbox.kill()
+        except Exception:  # nosec B110 - best-effort cleanup, sandbox may already be gone
+            pass
+
+
+# Process-wide sandbox pool; at exit it kills the idle sandboxes it created
+# and leaves sandboxes kept by callers (auto_close=False) running
+_POOL = SandboxPool()
+atexit.register(_POOL.close_all)
+
 
 class SandboxBackend:
     """Manages E2B sandbox creation and agent execution"""
 
-    def __init__(self, verbose: bool = True):
+    # E2B Sandbox class, imported on first use and shared by all instances
+    _Sandbox = None
+
+    # Resolves independent credentials (agent key + E2B key) concurrently on cache misses
+    _cred_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cred")
+
+    # Kills auto-closed sandboxes off the caller's critical path; drained at exit
+    _closer = ThreadPoolExecutor(max_workers=4, thread_name_prefix="e2b-close")
+    atexit.register(_closer.shutdown, wait=True)
+
+    # sandbox_ids that already have the Python API libraries installed, and a
+    # per-sandbox lock so concurrent runs in one sandbox install only once
+    _libs_installed: set = set()
+    _libs_locks: Dict[str, threading.Lock] = {}
+    _libs_lock = threading.Lock()
+
+    # Serializes building the local wheelhouse across threads
+    _wheelhouse_lock = threading.Lock()
+
+    def __init__(
+        self,
+        verbose: bool = True,
+        pool_size: int = 0,
+        cache_results: bool = False,
+        cache_ttl: Optional[float] = None
+    ):
         """
         Initialize sandbox backend
 
         Args:
-            verbose: Print status messages
+            verbose: Log status messages at INFO (otherwise DEBUG)
+            pool_size: Number of AI-template sandboxes to pre-warm in the background
+            cache_results: Return the previous result for a repeated execute_agent() call with the
+                same agent, model, prompt, working_dir, referenced file contents and download
+                settings (runs that downloaded files or used a caller's sandbox are not cached)
+            cache_ttl: Seconds a cached result stays valid (None keeps it until clear_cache())
         """
         self.verbose = verbose
+        # Quiet backends log at DEBUG so messages are filtered before formatting
+        self._log_level = logging.INFO if verbose else logging.DEBUG
+        if verbose:
+            _ensure_console_handler()
         self.resolver = CredentialResolver()
-        self.template_id_ai = self._load_template_id("ai")
-        self.template_id_base = self._load_template_id("base")
-        self._ensure_e2b_available()
+        # Env vars each agent's credential is exported as (Codex CLI reads CODEX_API_KEY,
+        # the OpenAI SDK reads OPENAI_API_KEY)
+        self._env_keys: Dict[str, Tuple[str, ...]] = {
+            agent: (key_name,) for agent, key_name in self.resolver.AGENT_KEY_MAP.items()
+        }
+        self._env_keys["codex"] = ("CODEX_API_KEY", self.resolver.AGENT_KEY_MAP["codex"])
+        self.template_id_ai = _load_template_id("ai")
+        self.template_id_base = _load_template_id("base")
+        self._cred_cache: Dict[str, str] = {}
+        self._cred_lock = threading.Lock()
+        # (sandbox_id, agent) pairs known to have the agent CLI installed
+        self._installed: set = set()
+        self._cli_cache: Dict[str, bool] = {}
+        self.cache_results = cache_results
+        self.cache_ttl = cache_ttl
+        self._result_cache: Dict[str, Tuple[float, dict]] = {}
+        self._result_lock = threading.Lock()
+
+        if pool_size > 0:
+            # Any agent name selects the AI agents template
+            self.warm_pool(agent="claude", count=pool_size)
+
+    def _log(self, msg: str, *args):
+        """Log a status message at this backend's verbosity level (%-style args)"""
+        logger.log(self._log_level, msg, *args)
+
+    def _get_cred(self, agent: str) -> str:
+        """
+        Resolve a credential once per backend and reuse it for later calls
+
+        Args:
+            agent: Agent name ("claude", "gemini", "codex", "e2b")
+
+        Returns:
+            The credential value
 
-    def _load_template_id(self, template_type: str = "ai") -> Optional[str]:
+        Raises:
+            CredentialNotFoundError: If credential not found in any source
         """
-        Load E2B template ID from file if it exists
+        with self._cred_lock:
+            credential = self._cred_cache.get(agent)
+            if credential is None:
+                credential = self.resolver.get_credential(agent, verbose=self.verbose)
+                self._cred_cache[agent] = credential
+            return credential
+
+    def _get_creds(self, agents: Tuple[str, ...]) -> List[str]:
+        """
+        Resolve several credentials, looking up cache misses concurrently
 
         Args:
-            template_type: "ai" for AI agents template, "base" for base template
+            agents: Agent names ("claude", "gemini", "codex", "e2b")
 
         Returns:
-            Template ID or None
+            Credential values in the same order as agents
+
+        Raises:
+            CredentialNotFoundError: If a credential is not found in any source
         """
-        if template_type == "ai":
-            template_file = Path(__file__).parent / ".e2b_template_id"
-        else:
-            template_file = Path(__file__).parent / ".e2b_template_id_base"
+        with self._cred_lock:
+            missing = [agent for agent in agents if agent not in self._cred_cache]
+        if len(missing) > 1:
+            futures = [
+                self._cred_pool.submit(self.resolver.get_credential, agent, verbose=self.verbose)
+                for agent in missing
+            ]
+            resolved = [future.result() for future in futures]
+            with self._cred_lock:
+                self._cred_cache.update(zip(missing, resolved))
+        return [self._get_cred(agent) for agent in agents]
+
+    def invalidate_credentials(self):
+        """Forget cached credentials so the next call re-runs the waterfall"""
+        with self._cred_lock:
+            self._cred_cache.clear()
+
+    def clear_cache(self):
+        """Forget cached agent results"""
+        with self._result_lock:
+            self._result_cache.clear()
+
+    def warm_pool(self, agent: Optional[str] = None, count: int = 1) -> bool:
+        """
+        Start creating idle sandboxes in the background so later execute()
+        calls skip the sandbox boot.
 
-        if template_file.exists():
-            template_id = template_file.read_text().strip()
-            if template_id:
-                return template_id
+        Args:
+            agent: Agent the sandboxes are for (selects the template), or None for raw commands
+            count: Number of sandboxes to keep ready
 
-        return None
+        Returns:
+            True if pre-warming was started
+        """
+        try:
+            e2b_key = self._get_cred("e2b")
+        except CredentialNotFoundError as e:
+            self._log("⚠️  Cannot pre-warm sandboxes: %s", e)
+            return False
+
+        # Import E2B here so a missing SDK is reported on the caller's thread
+        self._get_sandbox_cls()
+        template_id = self._select_template(agent=agent)
+        _POOL.prewarm(
+            SandboxPool.make_key(template_id, e2b_key),
+            lambda: self._create_sandbox(template_id, e2b_key, agent),
+            count
+        )
+        return True
 
     def _select_template(self, agent: Optional[str] = None) -> Optional[str]:
         """
@@ -64,39 +523,40 @@ class SandboxBackend:
         # If using an AI agent and AI template is available, use it
         if agent and agent.lower() in ["claude", "gemini", "codex"]:
             if self.template_id_ai:
-                if self.verbose:
-                    print(f"📦 Using AI agents template: {self.template_id_ai[:12]}...")
+                self._log("📦 Using AI agents template: %s...", self.template_id_ai[:12])
                 return self.template_id_ai
 
         # For raw CLI commands, use lightweight base template if available
         if self.template_id_base:
-            if self.verbose:
-                print(f"📦 Using base template: {self.template_id_base[:12]}...")
+            self._log("📦 Using base template: %s...", self.template_id_base[:12])
             return self.template_id_base
 
         # Fallback to AI template if no base template
         if self.template_id_ai:
-            if self.verbose:
-                print(f"📦 Using AI agents template (base not available): {self.template_id_ai[:12]}...")
+            self._log("📦 Using AI agents template (base not available): %s...", self.template_id_ai[:12])
             return self.template_id_ai
 
         # No templates available, use default E2B sandbox
-        if self.verbose:
-            print("📦 Using default E2B sandbox (no custom template)")
+        self._log("📦 Using default E2B sandbox (no custom template)")
         return None
 
-    def _ensure_e2b_available(self):
-        """Ensure E2B SDK is installed"""
-        try:
-            from e2b import Sandbox
-            self.Sandbox = Sandbox
-        except ImportError:
-            print("❌ E2B SDK not installed.")
-            print("\nTo use sandbox backend, install dependencies:")
-            print("  pip install -r requirements.txt")
-            print("\nOr install directly:")
-            print("  pip install e2b")
-            sys.exit(1)
+    @classmethod
+    def _get_sandbox_cls(cls):
+        """
+        Import the E2B Sandbox class on first use and cache it on the class
+
+        Raises:
+            SandboxBackendUnavailable: If the E2B SDK is not installed
+        """
+        if cls._Sandbox is None:
+            try:
+                from e2b import Sandbox
+            except ImportError as e:
+                raise SandboxBackendUnavailable(
+                    "E2B SDK not installed; run: pip install -r requirements.txt (or pip install e2b)"
+                ) from e
+            cls._Sandbox = Sandbox
+        return cls._Sandbox
 
     def _detect_file_references(self, prompt: str, working_dir: str = None) -> List[Dict[str, str]]:
         """
@@ -113,36 +573,32 @@ class SandboxBackend:
             working_dir = os.getcwd()
 
         file_refs = []
+        seen_paths = set()
+
+        # Lowercase once; patterns are matched case-sensitively against the
+        # lowered text and the filename is sliced from the original prompt.
+        prompt_lower = prompt.translate(_ASCII_LOWER_TABLE)
 
-        # Pattern 1: Common file extensions
-        file_patterns = [
-            r'(\.[a-zA-Z0-9_\-/]+\.(?:md|py|js|ts|tsx|jsx|json|yaml|yml|txt|csv|html|css|sh|bash))\b',  # Paths starting with .
-            r'\b([a-zA-Z0-9_\-/]+\.(?:md|py|js|ts|tsx|jsx|json|yaml|yml|txt|csv|html|css|sh|bash))\b',  # Regular paths
-            r'\b([A-Z][A-Z0-9_]+\.md)\b',  # UPPERCASE.md files like SKILL.MD, README.MD
-            r'\b(my\s+)?([a-zA-Z0-9_\-]+\.[a-zA-Z0-9]+)\b',  # "my file.txt" pattern
-        ]
-
-        for pattern in file_patterns:
-            matches = re.findall(pattern, prompt, re.IGNORECASE)
-            for match in matches:
-                # Handle tuple matches from groups
-                filename = match if isinstance(match, str) else match[-1]
-                filename = filename.strip()
+        for pattern in _FILE_REF_PATTERNS:
+            # Filename is always the last group of the pattern
+            group = pattern.groups
+            for m in pattern.finditer(prompt_lower):
+                filename = prompt[m.start(group):m.end(group)].strip()
 
                 if not filename:
                     continue
 
                 # Security: Prevent path traversal attacks
                 if '..' in filename or filename.startswith('/'):
-                    if self.verbose:
-                        print(f"⚠️  Skipping suspicious file path: {filename}")
+                    self._log("⚠️  Skipping suspicious file path: %s", filename)
                     continue
 
                 # Try to resolve the file path
                 local_path = Path(working_dir) / filename
 
                 # Also try without "my " prefix if present
-                if not local_path.exists() and filename.lower().startswith("my "):
+                filename_lower = filename.lower()
+                if not local_path.exists() and filename_lower.startswith("my "):
                     filename = filename[3:].strip()
                     local_path = Path(working_dir) / filename
 
@@ -151,9 +607,11 @@ class SandboxBackend:
                     sandbox_path = f"/home/user/{local_path.name}"
 
                     # Avoid duplicates
-                    if not any(ref['local_path'] == str(local_path) for ref in file_refs):
+                    local_path_str = str(local_path)
+                    if local_path_str not in seen_paths:
+                        seen_paths.add(local_path_str)
                         file_refs.append({
-                            'local_path': str(local_path),
+                            'local_path': local_path_str,
                             'sandbox_path': sandbox_path,
                             'original_ref': filename
                         })
@@ -172,33 +630,74 @@ class SandboxBackend:
             Dict mapping original references to sandbox paths
         """
         path_mapping = {}
+        entries = []
+        uploaded_refs = []
 
         for ref in file_refs:
             local_path = ref['local_path']
-            sandbox_path = ref['sandbox_path']
-            original_ref = ref['original_ref']
 
             try:
                 # Read local file
-                with open(local_path, 'r') as f:
-                    content = f.read()
+                with open(local_path, 'rb') as f:
+                    entries.append((ref['sandbox_path'], f.read()))
+                uploaded_refs.append(ref)
+            except Exception as e:
+                self._log("⚠️  Failed to upload %s: %s", local_path, e)
+
+        if not entries:
+            return path_mapping
 
-                # Upload to sandbox
-                sandbox.files.write(sandbox_path, content)
+        # Upload all files in a single round-trip
+        try:
+            self._upload_bundle(sandbox, entries)
+        except Exception as e:
+            self._log("⚠️  Failed to upload files: %s", e)
+            return path_mapping
 
-                if self.verbose:
-                    print(f"📤 Uploaded: {local_path} → {sandbox_path}")
+        for ref in uploaded_refs:
+            local_path = ref['local_path']
+            sandbox_path = ref['sandbox_path']
 
-                # Map original reference to sandbox path
-                path_mapping[original_ref] = sandbox_path
-                path_mapping[local_path] = sandbox_path
+            self._log("📤 Uploaded: %s → %s", local_path, sandbox_path)
 
-            except Exception as e:
-                if self.verbose:
-                    print(f"⚠️  Failed to upload {local_path}: {e}")
+            # Map original reference to sandbox path
+            path_mapping[ref['original_ref']] = sandbox_path
+            path_mapping[local_path] = sandbox_path
 
         return path_mapping
 
+    def _upload_bundle(self, sandbox, entries: List[Tuple[str, bytes]]):
+        """
+        Upload several files to the sandbox as one gzipped tar archive
+
+        Replaces one files.write() round-trip per file with a single write
+        plus a single extract command; gzip shrinks the (mostly text) payload.
+
+        Args:
+            sandbox: E2B sandbox instance
+            entries: List of (absolute sandbox path, file content) tuples
+
+        Raises:
+            RuntimeError: If extraction fails in the sandbox
+        """
+        buf = io.BytesIO()
+        now = time.time()
+        with tarfile.open(fileobj=buf, mode="w:gz", compresslevel=6) as tar:
+            for sandbox_path, content in entries:
+                info = tarfile.TarInfo(name=sandbox_path.lstrip("/"))
+                info.size = len(content)
+                info.mode = 0o644
+                info.mtime = now
+                tar.addfile(info, io.BytesIO(content))
+
+        bundle_path = f"{SANDBOX_BUNDLE_PREFIX}-{uuid.uuid4().hex}.tar.gz"
+        sandbox.files.write(bundle_path, buf.getvalue())
+        result = sandbox.commands.run(
+            f"tar -xzf {bundle_path} -C / && rm -f {bundle_path}"
+        )
+        if result.exit_code != 0:
+            raise RuntimeError(f"bundle extraction failed: {result.stderr}")
+
     def _rewrite_prompt_with_sandbox_paths(self, prompt: str, path_mapping: Dict[str, str]) -> str:
         """
         Rewrite the prompt to use sandbox paths
@@ -240,15 +739,13 @@ class SandboxBackend:
             # Check if output directory exists in sandbox
             result = sandbox.commands.run(f"test -d {sandbox_output_dir} && echo exists || echo missing")
             if "missing" in result.stdout:
-                if self.verbose:
-                    print(f"ℹ️  No output directory in sandbox ({sandbox_output_dir})")
+                self._log("ℹ️  No output directory in sandbox (%s)", sandbox_output_dir)
                 return downloaded_files
 
             # List all files in output directory recursively
             result = sandbox.commands.run(f"find {sandbox_output_dir} -type f")
             if result.exit_code != 0 or not result.stdout.strip():
-                if self.verbose:
-                    print(f"ℹ️  No files in sandbox output directory")
+                self._log("ℹ️  No files in sandbox output directory")
                 return downloaded_files
 
             file_paths = result.stdout.strip().split('\n')
@@ -257,8 +754,7 @@ class SandboxBackend:
             local_output_path = Path(output_dir)
             local_output_path.mkdir(parents=True, exist_ok=True)
 
-            if self.verbose:
-                print(f"\n📥 Downloading {len(file_paths)} file(s) from sandbox...")
+            self._log("\n📥 Downloading %s file(s) from sandbox...", len(file_paths))
 
             # Download each file
             for sandbox_file_path in file_paths:
@@ -269,8 +765,7 @@ class SandboxBackend:
                 try:
                     # Security: Validate file is within output directory
                     if not sandbox_file_path.startswith(f"{sandbox_output_dir}/"):
-                        if self.verbose:
-                            print(f"   ⚠️  Skipping file outside output directory: {sandbox_file_path}")
+                        self._log("   ⚠️  Skipping file outside output directory: %s", sandbox_file_path)
                         continue
 
                     # Get relative path from /home/user/output/
@@ -278,8 +773,7 @@ class SandboxBackend:
 
                     # Security: Prevent directory traversal in relative path
                     if '..' in relative_path or relative_path.startswith('/'):
-                        if self.verbose:
-                            print(f"   ⚠️  Skipping suspicious path: {relative_path}")
+                        self._log("   ⚠️  Skipping suspicious path: %s", relative_path)
                         continue
 
                     # Create local file path
@@ -295,19 +789,16 @@ class SandboxBackend:
 
                     downloaded_files.append(str(local_file_path))
 
-                    if self.verbose:
-                        print(f"   ✓ {sandbox_file_path} → {local_file_path}")
+                    self._log("   ✓ %s → %s", sandbox_file_path, local_file_path)
 
                 except Exception as e:
-                    if self.verbose:
-                        print(f"   ⚠️  Failed to download {sandbox_file_path}: {e}")
+                    self._log("   ⚠️  Failed to download %s: %s", sandbox_file_path, e)
 
-            if self.verbose and downloaded_files:
-                print(f"\n✅ Downloaded {len(downloaded_files)} file(s) to {output_dir}/")
+            if downloaded_files:
+                self._log("\n✅ Downloaded %d file(s) to %s/", len(downloaded_files), output_dir)
 
         except Exception as e:
-            if self.verbose:
-                print(f"⚠️  Error during file download: {e}")
+            self._log("⚠️  Error during file download: %s", e)
 
         return downloaded_files
 
@@ -319,7 +810,10 @@ class SandboxBackend:
         model: Optional[str] = None,
         working_dir: Optional[str] = None,
         download_output: bool = True,
-        output_dir: str = "./sandbox-output"
+        output_dir: str = "./sandbox-output",
+        on_stdout: Optional[Callable[[str], None]] = None,
+        on_stderr: Optional[Callable[[str], None]] = None,
+        sandbox=None
     ) -> dict:
         """
         Execute a command or an AI agent in an isolated E2B sandbox.
@@ -327,19 +821,32 @@ class SandboxBackend:
         Args:
             prompt: The prompt/task for the agent or the raw command to execute.
             agent: Agent name ("claude", "gemini", "codex") or None for raw command.
-            auto_close: Close sandbox after execution.
+            auto_close: Close sandbox after execution (otherwise it stays running and is pooled for reuse by later calls in this process).
             model: Optional model override.
             working_dir: Working directory to resolve file paths (defaults to cwd).
             download_output: Download files from /home/user/output/ after execution (default: True).
             output_dir: Local directory to save downloaded files (default: ./sandbox-output).
+            on_stdout: Optional callback receiving stdout chunks as they arrive.
+            on_stderr: Optional callback receiving stderr chunks as they arrive.
+            sandbox: Optional running sandbox owned by the caller. It is used instead of
+                creating one, runs the prompt in a throwaway /home/user/run-<uuid> working
+                directory and is never killed or pooled (auto_close is ignored for it).
 
         Returns:
             Dictionary with execution results.
+
+        Raises:
+            SandboxBackendUnavailable: If the E2B SDK is not installed
         """
-        # Resolve E2B key
+        self._get_sandbox_cls()
+
+        # Resolve the E2B key (and agent key, concurrently on a cache miss)
         try:
-            e2b_key = self.resolver.get_credential("e2b", verbose=self.verbose)
-        except CredentialNotFoundError as e:
+            if agent:
+                e2b_key, _ = self._get_creds(("e2b", agent))
+            else:
+                e2b_key = self._get_cred("e2b")
+        except (CredentialNotFoundError, ValueError) as e:
             return {
                 "success": False, "output": "", "error": str(e),
                 "sandbox_id": None, "downloaded_files": []
@@ -347,87 +854,487 @@ class SandboxBackend:
 
         # Detect file references in prompt
         file_refs = self._detect_file_references(prompt, working_dir)
-        if file_refs and self.verbose:
-            print(f"\n📁 Detected {len(file_refs)} local file(s) referenced in prompt")
-
-        if self.verbose:
-            print(f"\n🔨 Creating E2B sandbox for {'agent ' + agent if agent else 'raw command'}...")
+        if file_refs:
+            self._log("\n📁 Detected %d local file(s) referenced in prompt", len(file_refs))
 
+        if sandbox is not None:
+            workdir = f"/home/user/run-{uuid.uuid4().hex}"
+            try:
+                return self._run_in_sandbox(
+                    sandbox, None, prompt, agent, model, auto_close,
+                    file_refs, download_output, output_dir, on_stdout, on_stderr, cwd=workdir
+                )
+            except Exception as e:
+                return {
+                    "success": False, "output": "", "error": f"Sandbox execution failed: {str(e)}",
+                    "sandbox_id": sandbox.sandbox_id, "downloaded_files": []
+                }
+            finally:
+                self._closer.submit(self._remove_workdir, sandbox, workdir)
+
+        pool_key = None
         try:
-            # Set E2B API key
-            original_e2b_key = os.environ.get('E2B_API_KEY')
-            os.environ['E2B_API_KEY'] = e2b_key
-
-            # Select template
+            # Select template and reuse an idle pooled sandbox when one is available
             template_id = self._select_template(agent=agent)
-            sandbox = self.Sandbox.create(template=template_id) if template_id else self.Sandbox.create()
+            pool_key = SandboxPool.make_key(template_id, e2b_key)
+            sandbox, reused = _POOL.acquire(
+                pool_key,
+                lambda: self._create_sandbox(template_id, e2b_key, agent)
+            )
 
-            if self.verbose:
-                print(f"✓ Sandbox created: {sandbox.sandbox_id}")
+            if reused:
+                self._log("♻️  Reusing pooled sandbox: %s", sandbox.sandbox_id)
 
-            # Restore original E2B key
-            if original_e2b_key:
-                os.environ['E2B_API_KEY'] = original_e2b_key
-            elif 'E2B_API_KEY' in os.environ:
-                del os.environ['E2B_API_KEY']
-            
-            # Upload files
-            if file_refs:
-                path_mapping = self._upload_files_to_sandbox(sandbox, file_refs)
-                prompt = self._rewrite_prompt_with_sandbox_paths(prompt, path_mapping)
-                sandbox_file_paths = [ref['sandbox_path'] for ref in file_refs]
-            else:
-                sandbox_file_paths = []
+            return self._run_in_sandbox(
+                sandbox, template_id, prompt, agent, model, auto_close,
+                file_refs, download_output, output_dir, on_stdout, on_stderr
+            )
 
-            # Build and execute command
-            if agent:
-                # Agentic execution
-                agent_credential = self.resolver.get_credential(agent, verbose=self.verbose)
-                command = self._build_agent_command(agent, prompt, model, auto_close, sandbox_file_paths, sandbox)
-                
-                env_var_name = self.resolver.AGENT_KEY_MAP[agent]
-                safe_credential = agent_credential.replace("'", "'\\''")
-                
-                if agent == "codex":
-                    exec_command = f"export CODEX_API_KEY='{safe_credential}' && export OPENAI_API_KEY='{safe_credential}' && {command}"
+        except Exception as e:
+            return {
+                "success": False, "output": "", "error": f"Sandbox execution failed: {str(e)}",
+                "sandbox_id": None, "downloaded_files": []
+            }
+
+        finally:
+            if sandbox is not None:
+                if auto_close:
+                    # Kill sandbox in the background; the result is already in hand
+                    self._log("\n🔒 Auto-closing sandbox...")
+                    self._closer.submit(SandboxPool._discard, sandbox)
                 else:
-                    exec_command = f"export {env_var_name}='{safe_credential}' && {command}"
-            else:
-                # Raw command execution
-                exec_command = prompt
+                    # Keep it warm for the next execute() call
+                    _POOL.release(pool_key, sandbox, written=[ref['sandbox_path'] for ref in file_refs])
+
+    def _run_in_sandbox(
+        self,
+        sandbox,
+        template_id: Optional[str],
+        prompt: str,
+        agent: Optional[str],
+        model: Optional[str],
+        auto_close: bool,
+        file_refs: List[Dict[str, str]],
+        download_output: bool,
+        output_dir: str,
+        on_stdout: Optional[Callable[[str], None]] = None,
+        on_stderr: Optional[Callable[[str], None]] = None,
+        cwd: Optional[str] = None
+    ) -> dict:
+        """
+        Upload referenced files, run the prompt in an already-running sandbox and collect results.
+
+        Shared by execute() and SandboxSession.run(); sandbox lifecycle is left to the caller.
+
+        Args:
+            sandbox: Running E2B sandbox instance.
+            template_id: Template the sandbox was created from.
+            prompt: The prompt/task for the agent or the raw command to execute.
+            agent: Agent name or None for raw command.
+            model: Optional model override.
+            auto_close: Passed through to the agent command builder.
+            file_refs: File references detected in the prompt.
+            download_output: Download files from /home/user/output/ after execution.
+            output_dir: Local directory to save downloaded files.
+            on_stdout: Optional callback receiving stdout chunks as they arrive.
+            on_stderr: Optional callback receiving stderr chunks as they arrive.
+            cwd: Optional working directory, created if missing, to run the command in.
 
-            if self.verbose:
-                print(f"🚀 Executing: {exec_command}\n")
+        Returns:
+            Dictionary with execution results.
+        """
+        # Upload files
+        if file_refs:
+            path_mapping = self._upload_files_to_sandbox(sandbox, file_refs)
+            prompt = self._rewrite_prompt_with_sandbox_paths(prompt, path_mapping)
+            sandbox_file_paths = [ref['sandbox_path'] for ref in file_refs]
+        else:
+            sandbox_file_paths = []
+
+        # Build and execute command
+        if agent:
+            # Agentic execution
+            agent_credential = self._get_cred(agent)
+            command = self._build_agent_command(agent, prompt, model, auto_close, sandbox_file_paths, sandbox)
+
+            # Python API fallback outside the AI template needs the SDKs installed
+            if not template_id or template_id != self.template_id_ai:
+                if not self._check_cli_availability(agent, sandbox):
+                    self._install_python_api_libs(sandbox)
             
-            result = sandbox.commands.run(exec_command, timeout=300)
+            safe_credential = _shell_quote(agent_credential)
+            exports = " && ".join(f"export {name}={safe_credential}" for name in self._env_keys[agent])
+            exec_command = f"{exports} && {command}"
+        else:
+            # Raw command execution
+            exec_command = prompt
+
+        if cwd:
+            exec_command = f"mkdir -p {_shell_quote(cwd)} && cd {_shell_quote(cwd)} && {exec_command}"
+
+        self._log("🚀 Executing: %s\n", exec_command)
+        
+        # Collect output chunks as they stream in, forwarding them to the caller's callbacks
+        stdout_chunks: List[str] = []
+        stderr_chunks: List[str] = []
+
+        def handle_stdout(chunk: str):
+            stdout_chunks.append(chunk)
+            if on_stdout:
+                on_stdout(chunk)
+
+        def handle_stderr(chunk: str):
+            stderr_chunks.append(chunk)
+            if on_stderr:
+                on_stderr(chunk)
+
+        result = sandbox.commands.run(
+            exec_command, timeout=300, on_stdout=handle_stdout, on_stderr=handle_stderr
+        )
+
+        output = "".join(stdout_chunks) or getattr(result, 'stdout', "") or ""
+        err_raw = "".join(stderr_chunks) or getattr(result, 'stderr', None) or None
+        err_obj = getattr(result, 'error', None)
+        error = str(err_obj) if err_obj else err_raw
+        exit_code = getattr(result, 'exit_code', 0)
+
+        if output: self._log("\n[Output]\n%s", output)
+        if error: self._log("\n[Error]\n%s", error)
+        self._log("\nExit code: %s", exit_code)
+
+        # Download output files
+        downloaded_files = self._download_output_files(sandbox, output_dir) if download_output else []
+
+        return {
+            "success": exit_code == 0, "output": output, "error": error,
+            "sandbox_id": sandbox.sandbox_id, "downloaded_files": downloaded_files
+        }
 
-            output = result.stdout if hasattr(result, 'stdout') else ""
-            error = result.stderr if hasattr(result, 'stderr') and result.stderr else None
-            exit_code = result.exit_code if hasattr(result, 'exit_code') else 0
+    @staticmethod
+    def _remove_workdir(sandbox, workdir: str):
+        """Delete a per-run working directory from a caller-owned sandbox, ignoring errors"""
+        try:
+            sandbox.commands.run(f"rm -rf {_shell_quote(workdir)}", timeout=30)
+        except Exception:  # nosec B110 - best-effort cleanup, sandbox may already be gone
+            pass
 
-            if self.verbose:
-                if output: print(f"\n[Output]\n{output}")
-                if error: print(f"\n[Error]\n{error}")
-                print(f"\nExit code: {exit_code}")
+    def execute_agent(
+        self,
+        agent: str,
+        prompt: str,
+        auto_close: bool = False,
+        model: Optional[str] = None,
+        **kwargs
+    ) -> dict:
+        """
+        Execute an AI agent in an E2B sandbox (agent-first form of execute()).
 
-            # Download output files
-            downloaded_files = self._download_output_files(sandbox, output_dir) if download_output else []
+        Args:
+            agent: Agent name ("claude", "gemini", "codex")
+            prompt: The prompt/task for the agent
+            auto_close: Close sandbox after execution
+            model: Optional model override
+            **kwargs: Passed through to execute() (working_dir, download_output, output_dir,
+                on_stdout, on_stderr, sandbox)
 
-            # Kill sandbox if auto-close enabled
-            if auto_close:
-                if self.verbose: print("\n🔒 Auto-closing sandbox...")
-                sandbox.kill()
+        Returns:
+            Dictionary with execution results (a cached copy with sandbox_id None
+            when result caching is enabled and the same inputs ran before)
+        """
+        # A caller-owned sandbox carries state of its own, so its runs are never cached
+        if not self.cache_results or kwargs.get("sandbox") is not None:
+            return self.execute(prompt, agent=agent, auto_close=auto_close, model=model, **kwargs)
+
+        cache_key = self._result_cache_key(agent, model, prompt, kwargs)
+        with self._result_lock:
+            cached = self._result_cache.get(cache_key)
+        if cached is not None:
+            stored_at, cached_result = cached
+            if self.cache_ttl is None or time.monotonic() - stored_at < self.cache_ttl:
+                self._log("💾 Using cached result for %s prompt", agent)
+                return {**cached_result, "sandbox_id": None}
+
+        result = self.execute(prompt, agent=agent, auto_close=auto_close, model=model, **kwargs)
+        # Downloaded files may be changed or removed later, so those results aren't replayed
+        if result["success"] and not result["downloaded_files"]:
+            with self._result_lock:
+                self._result_cache[cache_key] = (time.monotonic(), dict(result))
+        return result
+
+    def _result_cache_key(self, agent: str, model: Optional[str], prompt: str, kwargs: dict) -> str:
+        """
+        Result cache key covering everything that shapes an execute_agent() result
 
-            return {
-                "success": exit_code == 0, "output": output, "error": error,
-                "sandbox_id": sandbox.sandbox_id, "downloaded_files": downloaded_files
-            }
+        Args:
+            agent: Agent name
+            model: Optional model override
+            prompt: The prompt/task for the agent
+            kwargs: Keyword arguments passed through to execute()
+
+        Returns:
+            Hex digest of the agent, model, prompt, working directory, contents of the
+            files the prompt references and the download settings
+        """
+        working_dir = kwargs.get("working_dir") or os.getcwd()
+        digest = hashlib.sha256()
+        for part in (
+            agent, model, prompt, working_dir,
+            kwargs.get("download_output", True), kwargs.get("output_dir", "./sandbox-output"),
+        ):
+            digest.update(f"{part}\0".encode())
+        for ref in self._detect_file_references(prompt, working_dir):
+            digest.update(ref["local_path"].encode() + b"\0")
+            try:
+                with open(ref["local_path"], "rb") as f:
+                    digest.update(hashlib.sha256(f.read()).digest())
+            except OSError:
+                digest.update(b"unreadable")
+        return digest.hexdigest()
+
+    async def execute_agent_async(
+        self,
+        agent: str,
+        prompt: str,
+        auto_close: bool = False,
+        model: Optional[str] = None,
+        **kwargs
+    ) -> dict:
+        """
+        Async form of execute_agent() that does not block the event loop.
+
+        Args:
+            agent: Agent name ("claude", "gemini", "codex")
+            prompt: The prompt/task for the agent
+            auto_close: Close sandbox after execution
+            model: Optional model override
+            **kwargs: Passed through to execute()
+
+        Returns:
+            Dictionary with execution results
+        """
+        return await asyncio.to_thread(
+            self.execute, prompt, agent=agent, auto_close=auto_close, model=model, **kwargs
+        )
+
+    async def execute_batch(self, jobs: List[dict], max_concurrency: int = 4) -> List[dict]:
+        """
+        Run several executions concurrently.
+
+        Wall time is roughly the slowest job instead of the sum of all jobs,
+        bounded by max_concurrency (and E2B's concurrent sandbox limit).
+
+        Args:
+            jobs: List of keyword-argument dicts for execute() (each needs "prompt")
+            max_concurrency: Maximum sandboxes running at once
+
+        Returns:
+            List of result dictionaries, in the same order as jobs
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(job: dict) -> dict:
+            async with semaphore:
+                return await asyncio.to_thread(self.execute, **job)
+
+        return await asyncio.gather(*(run(job) for job in jobs))
+
+    def _create_sandbox(self, template_id: Optional[str], e2b_key: str, agent: Optional[str] = None):
+        """
+        Create a new E2B sandbox
+
+        Args:
+            template_id: Template ID, or None for the default E2B sandbox
+            e2b_key: E2B API key
+            agent: Agent name (for status messages only)
+
+        Returns:
+            E2B sandbox instance
+        """
+        self._log("\n🔨 Creating E2B sandbox for %s...", 'agent ' + agent if agent else 'raw command')
 
+        Sandbox = self._get_sandbox_cls()
+
+        # Pass the key explicitly instead of swapping os.environ['E2B_API_KEY']
+        if template_id:
+            sandbox = Sandbox.create(template=template_id, api_key=e2b_key)
+        else:
+            sandbox = Sandbox.create(api_key=e2b_key)
+
+        self._log("✓ Sandbox created: %s", sandbox.sandbox_id)
+
+        return sandbox
+
+    def _prepare_wheelhouse(self, python_version: str) -> Optional[Path]:
+        """
+        Ensure a local wheelhouse exists for the sandbox's Python version.
+
+        Wheels are downloaded once (for manylinux x86_64, matching E2B sandboxes)
+        and reused for every later sandbox.
+
+        Args:
+            python_version: Sandbox Python version, e.g. "3.10"
+
+        Returns:
+            Path to the wheelhouse directory, or None if it could not be built
+        """
+        wheel_dir = WHEELHOUSE_DIR / f"py{python_version}"
+        marker = wheel_dir / ".complete"
+        if marker.exists():
+            return wheel_dir
+
+        with self._wheelhouse_lock:
+            # Another thread may have finished it while we waited
+            if marker.exists():
+                return wheel_dir
+            return self._build_wheelhouse(python_version, wheel_dir)
+
+    def _build_wheelhouse(self, python_version: str, wheel_dir: Path) -> Optional[Path]:
+        """
+        Download the wheels into a private directory and move it into place when complete.
+
+        Args:
+            python_version: Sandbox Python version, e.g. "3.10"
+            wheel_dir: Final wheelhouse directory
+
+        Returns:
+            Path to the wheelhouse directory, or None if it could not be built
+        """
+        self._log("📦 Downloading wheels for Python %s to %s (first run)...", python_version, wheel_dir)
+
+        staging_dir = wheel_dir.with_name(f"{wheel_dir.name}.{uuid.uuid4().hex}.partial")
+        try:
+            staging_dir.mkdir(parents=True)
+            result = subprocess.run(
+                [
+                    sys.executable, "-m", "pip", "download", "-q",
+                    "-d", str(staging_dir),
+                    "--only-binary=:all:",
+                    "--platform", "manylinux2014_x86_64",
+                    "--python-version", python_version,
+                    *PYTHON_API_PACKAGES,
+                ],
+                capture_output=True,
+                text=True,
+                timeout=600
+            )
+            if result.returncode == 0 and any(staging_dir.glob("*.whl")):
+                (staging_dir / ".complete").touch()
+                # Drop an incomplete directory left by an interrupted older run, then publish
+                if not (wheel_dir / ".complete").exists():
+                    shutil.rmtree(wheel_dir, ignore_errors=True)
+                try:
+                    os.rename(staging_dir, wheel_dir)
+                except OSError:
+                    pass  # nosec B110 - another process published it first
+                if (wheel_dir / ".complete").exists():
+                    return wheel_dir
+            else:
+                self._log("⚠️  Wheel download failed: %s", result.stderr.strip())
         except Exception as e:
-            return {
-                "success": False, "output": "", "error": f"Sandbox execution failed: {str(e)}",
-                "sandbox_id": None, "downloaded_files": []
-            }
+            self._log("⚠️  Wheel download failed: %s", e)
+        finally:
+            # Don't leave a partial wheelhouse behind
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+        return None
+
+    def _install_python_api_libs(self, sandbox) -> bool:
+        """
+        Install the Python API libraries in a sandbox without the AI template.
+
+        Installs offline from the local wheelhouse when possible, falling back to
+        a network pip install inside the sandbox. Each sandbox is installed into
+        once; later calls (pool reuse, sessions, shared sandboxes) return at once.
+
+        Args:
+            sandbox: E2B sandbox instance
+
+        Returns:
+            True if installation succeeded
+        """
+        sandbox_id = sandbox.sandbox_id
+        with self._libs_lock:
+            if sandbox_id in self._libs_installed:
+                return True
+            sandbox_lock = self._libs_locks.setdefault(sandbox_id, threading.Lock())
+
+        with sandbox_lock:
+            if sandbox_id in self._libs_installed:
+                return True
+            installed = self._install_python_api_libs_now(sandbox)
+            if installed:
+                with self._libs_lock:
+                    self._libs_installed.add(sandbox_id)
+            return installed
+
+    def _install_python_api_libs_now(self, sandbox) -> bool:
+        """Install the Python API libraries unconditionally (see _install_python_api_libs)"""
+        packages = " ".join(PYTHON_API_PACKAGES)
+
+        try:
+            # Wheel tags must match the sandbox interpreter, not the local one
+            result = sandbox.commands.run(
+                "python3 -c 'import sys; print(\"%d.%d\" % sys.version_info[:2])'"
+            )
+            wheel_dir = self._prepare_wheelhouse(result.stdout.strip())
+
+            if wheel_dir:
+                self._log("📦 Installing Python API libraries from local wheelhouse...")
+                self._upload_bundle(sandbox, [
+                    (f"{SANDBOX_WHEELHOUSE_DIR}/{wheel.name}", wheel.read_bytes())
+                    for wheel in wheel_dir.glob("*.whl")
+                ])
+                install_cmd = f"pip3 install -q --no-index --find-links={SANDBOX_WHEELHOUSE_DIR} {packages}"
+            else:
+                self._log(
+                    "⚠️  No AI template and no local wheelhouse: installing Python API "
+                    "libraries over the network (slow). Build the AI template to skip this."
+                )
+                install_cmd = f"pip3 install -q {packages}"
+
+            result = sandbox.commands.run(install_cmd, timeout=300)
+            return result.exit_code == 0
+        except Exception as e:
+            self._log("⚠️  Failed to install Python API libraries: %s", e)
+            return False
+
+    def check_clis_bulk(self, sandbox, agents: List[str]) -> Dict[str, bool]:
+        """
+        Check which agent CLIs are available in the sandbox with a single command.
+        Results share the cache used by _check_cli_availability().
+
+        Args:
+            sandbox: E2B sandbox instance
+            agents: Agent names ("claude", "gemini", "codex")
+
+        Returns:
+            Dictionary mapping each agent to True if its CLI is available
+        """
+        probes = []
+        for agent in agents:
+            if agent in self._cli_cache:
+                continue
+            if agent in _CLI_EXECUTABLES:
+                probes.append(agent)
+            else:
+                self._cli_cache[agent] = False
+
+        if probes:
+            names = " ".join(_CLI_EXECUTABLES[agent] for agent in probes)
+            try:
+                result = sandbox.commands.run(
+                    f"for c in {names}; do command -v $c >/dev/null && echo $c:1 || echo $c:0; done",
+                    timeout=30
+                )
+                found = dict(line.rpartition(":")[::2] for line in (result.stdout or "").splitlines())
+                for agent in probes:
+                    self._cli_cache[agent] = found.get(_CLI_EXECUTABLES[agent]) == "1"
+            except Exception as e:
+                self._log("   → Using Python API (CLI check failed: %s)", e)
+                for agent in probes:
+                    self._cli_cache[agent] = False
+
+        return {agent: self._cli_cache[agent] for agent in agents}
 
     def _check_cli_availability(self, agent: str, sandbox) -> bool:
         """
@@ -441,19 +1348,10 @@ class SandboxBackend:
         Returns:
             True if CLI is available, False otherwise
         """
-        if not hasattr(self, '_cli_cache'):
-            self._cli_cache = {}
-
         if agent in self._cli_cache:
             return self._cli_cache[agent]
 
-        cli_commands = {
-            "claude": "claude",
-            "gemini": "gemini",
-            "codex": "codex"
-        }
-
-        cli_name = cli_commands.get(agent)
+        cli_name = _CLI_EXECUTABLES.get(agent)
         if not cli_name:
             self._cli_cache[agent] = False
             return False
@@ -464,15 +1362,14 @@ class SandboxBackend:
 
             self._cli_cache[agent] = available
 
-            if self.verbose and available:
-                print(f"   ✓ Using real {agent} CLI")
-            elif self.verbose:
-                print(f"   → Using Python API for {agent} (CLI not available)")
+            if available:
+                self._log("   ✓ Using real %s CLI", agent)
+            else:
+                self._log("   → Using Python API for %s (CLI not available)", agent)
 
             return available
         except Exception as e:
-            if self.verbose:
-                print(f"   → Using Python API for {agent} (CLI check failed: {e})")
+            self._log("   → Using Python API for %s (CLI check failed: %s)", agent, e)
             self._cli_cache[agent] = False
             return False
 
@@ -502,29 +1399,11 @@ class SandboxBackend:
             file_context = f"\n\nFiles available in working directory: {file_list}"
             prompt = prompt + file_context
 
-        # Escape prompt for shell (handle single quotes)
-        safe_prompt = prompt.replace("'", "'\\''")
+        # Quote prompt for shell
+        safe_prompt = _shell_quote(prompt)
 
-        # Build CLI command based on agent
-        if agent == "claude":
-            model_flag = f"--model {model}" if model else ""
-            # Claude Code CLI: claude code -p "prompt"
-            return f"claude code -p '{safe_prompt}' {model_flag}".strip()
-
-        elif agent == "gemini":
-            model_flag = f"--model {model}" if model else ""
-            # Gemini CLI: gemini -y -p "prompt"
-            # Note: -y (--yolo) flag required, -p flag deprecated but shows actual output
-            return f"gemini -y -p '{safe_prompt}' {model_flag}".strip()
-
-        elif agent == "codex":
-            # Codex CLI non-interactive mode: codex exec "prompt"
-            # Use --full-auto for file modifications, --sandbox danger-full-access for full access,
-            # and --skip-git-repo-check since sandbox may not have git repo
-            return f"codex exec --full-auto --sandbox danger-full-access --skip-git-repo-check '{safe_prompt}'".strip()
-
-        else:
-            raise ValueError(f"CLI not supported for agent: {agent}")
+        prefix, suffix = _cli_command_parts(agent, model)
+        return f"{prefix}{safe_prompt}{suffix}"
 
     def _build_agent_command(
         self,
@@ -556,8 +1435,7 @@ class SandboxBackend:
             try:
                 return self._build_cli_command(agent, prompt, model, file_paths)
             except Exception as e:
-                if self.verbose:
-                    print(f"   ⚠️  CLI command build failed: {e}, using Python API")
+                self._log("   ⚠️  CLI command build failed: %s, using Python API", e)
 
         # Fallback to Python API
         return self._build_python_api_command(agent, prompt, model, file_paths)
@@ -587,14 +1465,15 @@ class SandboxBackend:
         # Build file reading logic if files are present
         file_reading_code = ""
         if file_paths:
-            file_reading_code = "\n# Read file contents\nfile_contents = {}\n"
-            for path in file_paths:
-                file_reading_code += f"""
-try:
-    with open('{path}', 'r') as f:
-        file_contents['{path}'] = f.read()
-except Exception as e:
-    file_contents['{path}'] = f'[Error reading file: {{e}}]'
+            file_reading_code = f"""
+# Read file contents
+file_contents = {{}}
+for path in {json.dumps(list(file_paths), ensure_ascii=False)}:
+    try:
+        with open(path, 'r') as f:
+            file_contents[path] = f.read()
+    except Exception as e:
+        file_contents[path] = f'[Error reading file: {{e}}]'
 """
             # Update prompt to include file contents
             file_reading_code += """
@@ -606,92 +1485,224 @@ for path, content in file_contents.items():
     enhanced_prompt = enhanced_prompt.replace(path, file_marker)
 """
 
-        # Escape single quotes in prompt for shell and Python safety
-        safe_prompt = prompt.replace("'", "'\\''").replace('"', '\\"')
+        # JSON string literals are valid Python literals; encoding is C-speed
+        # and needs no manual escaping. The whole script is shell-quoted below.
+        prompt_literal = json.dumps(prompt, ensure_ascii=False)
 
         # Choose prompt variable based on whether files are present
         prompt_var = "enhanced_prompt" if file_paths else "prompt"
 
-        if agent == "claude":
-            # Use Anthropic Python API
-            model_str = f'"{model}"' if model else '"claude-3-5-sonnet-20241022"'
-            script = f"""import os, anthropic
-prompt = {repr(safe_prompt)}
-{file_reading_code}
-client = anthropic.Anthropic(api_key=os.environ['ANTHROPIC_API_KEY'])
-response = client.messages.create(
-    model={model_str},
-    max_tokens=4096,
-    messages=[{{'role': 'user', 'content': {prompt_var}}}]
-)
-print(response.content[0].text)
-"""
-            return f'python3 -c "{script}"'
+        try:
+            default_model, script_template = _PYTHON_API_SCRIPTS[agent]
+        except KeyError:
+            raise ValueError(f"Unknown agent: {agent}") from None
+
+        script = script_template.format(
+            prompt_literal=prompt_literal,
+            file_reading_code=file_reading_code,
+            model_str=json.dumps(model or default_model),
+            prompt_var=prompt_var,
+        )
+        return f"python3 -c {shlex.quote(script)}"
+
+    def session(self, agent: Optional[str] = None, idle_seconds: float = 240.0) -> "SandboxSession":
+        """
+        Open a SandboxSession that keeps one sandbox alive across run() calls
 
-        elif agent == "gemini":
-            # Use Google Genai Python API (new library)
-            model_str = f'"{model}"' if model else '"gemini-2.0-flash-exp"'
-            script = f"""import os
-from google import genai
-prompt = {repr(safe_prompt)}
-{file_reading_code}
-client = genai.Client(api_key=os.environ['GEMINI_API_KEY'])
-response = client.models.generate_content(
-    model={model_str},
-    contents={prompt_var}
-)
-print(response.text)
-"""
-            return f'python3 -c "{script}"'
+        Args:
+            agent: Agent whose template the sandbox is created from
+            idle_seconds: Kill the sandbox after this many idle seconds
 
-        elif agent == "codex":
-            # Use OpenAI Python API
-            model_str = f'"{model}"' if model else '"gpt-4-turbo-preview"'
-            script = f"""import os
-from openai import OpenAI
-prompt = {repr(safe_prompt)}
-{file_reading_code}
-client = OpenAI(api_key=os.environ['OPENAI_API_KEY'])
-response = client.chat.completions.create(
-    model={model_str},
-    messages=[{{'role': 'user', 'content': {prompt_var}}}]
-)
-print(response.choices[0].message.content)
-"""
-            return f'python3 -c "{script}"'
+        Returns:
+            SandboxSession (use as a context manager)
+        """
+        return SandboxSession(self, agent=agent, idle_seconds=idle_seconds)
 
-        else:
-            raise ValueError(f"Unknown agent: {agent}")
+    # pip package providing each agent CLI (runtime install fallback)
+    AGENT_PACKAGES = {
+        "claude": "anthropic-claude-cli",
+        "gemini": "google-gemini-cli",
+        "codex": "openai-codex-cli"
+    }
 
-    def install_agent(self, agent: str, sandbox) -> bool:
+    def install_agents(self, agents: List[str], sandbox) -> bool:
         """
-        Install an agent CLI in the sandbox
+        Install several agent CLIs in the sandbox with one probe and one pip run
+
+        Fallback only: execute() relies on the pre-built AI agents template
+        (see e2b-template/) and never installs CLIs at runtime.
 
         Args:
-            agent: Agent name
+            agents: Agent names
             sandbox: E2B sandbox instance
 
         Returns:
-            True if installation succeeded
+            True if every agent CLI is available afterwards
         """
-        install_commands = {
-            "claude": "pip install anthropic-claude-cli",
-            "gemini": "pip install google-gemini-cli",
-            "codex": "pip install openai-codex-cli"
-        }
-
-        cmd = install_commands.get(agent)
-        if not cmd:
+        if any(agent not in self.AGENT_PACKAGES for agent in agents):
             return False
 
+        pending = [agent for agent in agents if (sandbox.sandbox_id, agent) not in self._installed]
+        if not pending:
+            return True
+
         try:
-            if self.verbose:
-                print(f"📦 Installing {agent} CLI in sandbox...")
-            result = sandbox.run_code(cmd)
-            return result.error is None
+            # A PATH lookup is far cheaper than a pip resolver run
+            names = " ".join(pending)
+            probe = sandbox.commands.run(
+                f"for a in {names}; do command -v $a >/dev/null 2>&1 && echo $a; done; true"
+            )
+            present = set((probe.stdout or "").split())
+            missing = [agent for agent in pending if agent not in present]
+
+            if missing:
+                self._log("📦 Installing %s CLI in sandbox...", ', '.join(missing))
+                packages = " ".join(self.AGENT_PACKAGES[agent] for agent in missing)
+                result = sandbox.commands.run(f"pip install {packages}")
+                if result.exit_code != 0:
+                    return False
+
+            self._installed.update((sandbox.sandbox_id, agent) for agent in pending)
+            return True
         except Exception:
             return False
 
+    def install_agent(self, agent: str, sandbox) -> bool:
+        """
+        Install an agent CLI in the sandbox (see install_agents())
+
+        Args:
+            agent: Agent name
+            sandbox: E2B sandbox instance
+
+        Returns:
+            True if installation succeeded
+        """
+        return self.install_agents([agent], sandbox)
+
+
+class SandboxSession:
+    """
+    Owns one long-lived E2B sandbox shared by several run() calls.
+
+    Files, installed packages and CLI state persist between calls, so a
+    multi-step workflow pays for sandbox creation once. The sandbox is killed
+    on exit, or after idle_seconds without a run() call.
+
+    Example:
+        with SandboxSession(backend, agent="claude") as session:
+            session.run("write fib.py in /home/user/output")
+            session.run("add tests for /home/user/output/fib.py")
+    """
+
+    def __init__(self, backend: "SandboxBackend", agent: Optional[str] = None, idle_seconds: float = 240.0):
+        """
+        Initialize the session
+
+        Args:
+            backend: SandboxBackend used for credentials, templates and execution
+            agent: Agent whose template the sandbox is created from (None for base template)
+            idle_seconds: Kill the sandbox after this many seconds without a run() (0 disables)
+        """
+        self.backend = backend
+        self.agent = agent
+        self.idle_seconds = idle_seconds
+        self.sandbox = None
+        self.template_id = None
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+
+    def __enter__(self) -> "SandboxSession":
+        e2b_key = self.backend._get_cred("e2b")
+        self.template_id = self.backend._select_template(agent=self.agent)
+        self.sandbox = self.backend._create_sandbox(self.template_id, e2b_key, self.agent)
+        self._arm_timer()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def run(
+        self,
+        prompt: str,
+        agent: Optional[str] = None,
+        model: Optional[str] = None,
+        working_dir: Optional[str] = None,
+        download_output: bool = True,
+        output_dir: str = "./sandbox-output",
+        on_stdout: Optional[Callable[[str], None]] = None,
+        on_stderr: Optional[Callable[[str], None]] = None
+    ) -> dict:
+        """
+        Run a prompt or raw command in the session sandbox.
+
+        Args:
+            prompt: The prompt/task for the agent or the raw command to execute.
+            agent: Agent name (defaults to the session agent; None with no session agent runs a raw command).
+            model: Optional model override.
+            working_dir: Working directory to resolve file paths (defaults to cwd).
+            download_output: Download files from /home/user/output/ after execution (default: True).
+            output_dir: Local directory to save downloaded files (default: ./sandbox-output).
+            on_stdout: Optional callback receiving stdout chunks as they arrive.
+            on_stderr: Optional callback receiving stderr chunks as they arrive.
+
+        Returns:
+            Dictionary with execution results.
+        """
+        agent = agent or self.agent
+        with self._lock:
+            self._cancel_timer()
+            if self.sandbox is None:
+                return {
+                    "success": False, "output": "", "error": "Session sandbox is closed",
+                    "sandbox_id": None, "downloaded_files": []
+                }
+            try:
+                file_refs = self.backend._detect_file_references(prompt, working_dir)
+                return self.backend._run_in_sandbox(
+                    self.sandbox, self.template_id, prompt, agent, model, False,
+                    file_refs, download_output, output_dir, on_stdout, on_stderr
+                )
+            except Exception as e:
+                return {
+                    "success": False, "output": "", "error": f"Sandbox execution failed: {str(e)}",
+                    "sandbox_id": self.sandbox.sandbox_id, "downloaded_files": []
+                }
+            finally:
+                self._arm_timer()
+
+    def close(self):
+        """Kill the session sandbox (idempotent)."""
+        with self._lock:
+            self._cancel_timer()
+            sandbox, self.sandbox = self.sandbox, None
+        if sandbox is not None:
+            self.backend._log("\n🔒 Closing session sandbox: %s", sandbox.sandbox_id)
+            try:
+                sandbox.kill()
+            except Exception:  # nosec B110 - best-effort cleanup, sandbox may already be gone
+                pass
+
+    def _arm_timer(self):
+        if self.idle_seconds and self.idle_seconds > 0:
+            timer = threading.Timer(self.idle_seconds, self._expire)
+            timer.daemon = True
+            self._timer = timer
+            timer.start()
+
+    def _expire(self):
+        # A timer that fired while run() held the lock is stale once run() re-arms
+        with self._lock:
+            if self._timer is not threading.current_thread():
+                return
+        self.backend._log("\n⏱️  Session idle for %.0fs", self.idle_seconds)
+        self.close()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
 
 def execute_in_sandbox(
     agent: str,
@@ -708,7 +1719,7 @@ def execute_in_sandbox(
         prompt: The prompt/task
         auto_close: Close sandbox after execution
         model: Optional model override
-        verbose: Print status messages
+        verbose: Log status messages
 
     Returns:
         Execution result dictionary
@@ -730,7 +1741,11 @@ if __name__ == "__main__":
     prompt = " ".join(sys.argv[2:])
 
     print(f"Testing sandbox execution: {agent}")
-    result = execute_in_sandbox(agent, prompt, auto_close=True)
+    try:
+        result = execute_in_sandbox(agent, prompt, auto_close=True)
+    except SandboxBackendUnavailable as e:
+        print(f"❌ {e}")
+        sys.exit(1)
 
     print("\n" + "="*60)
     print("RESULT:")
@@ -7,17 +7,31 @@ Optimized for NVIDIA DGX and GPU workstations.
 Features:
 - SSH connection via Paramiko with key-based authentication
 - Connection pooling for performance
-- GPU detection via nvidia-smi
+- GPU detection via a persistent NVML helper (nvidia-smi fallback)
 - File transfer via Samba share (primary) or SFTP (fallback)
 - Remote AI agent execution (claude, gemini, codex)
 - API key injection at runtime (never stored on remote)
 """
 
+import atexit
+import csv
+import io
+import json
+import os
+import select
+import shutil
+import socket
+import stat
 import sys
 import shlex
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional, List, Dict, Tuple
-from dataclasses import dataclass
+from typing import Optional, List, Dict, Tuple, NamedTuple
 
 # Add tools directory to path for imports
 tools_dir = Path(__file__).parent
@@ -27,33 +41,345 @@ if str(tools_dir) not in sys.path:
 from credential_resolver import CredentialResolver, CredentialNotFoundError
 from ssh_host_config import SSHHostConfigManager, SSHHostConfig
 
+# Directories prepended to PATH for non-interactive SSH shells, which often have a minimal PATH
+DEFAULT_REMOTE_PATH = "/usr/local/bin:/usr/bin:/bin:/usr/sbin:/sbin"
+
+# Flow-control sizes for channels opened on pooled connections (paramiko defaults are
+# 2 MiB / 32 KiB), so large SFTP uploads keep more data in flight per round trip
+CHANNEL_WINDOW_SIZE = 64 * 1024 * 1024
+CHANNEL_MAX_PACKET_SIZE = 256 * 1024
+
+# Prompts longer than this are uploaded over SFTP instead of embedded in the command line
+PROMPT_FILE_THRESHOLD = 4096
+
+# Full nvidia-smi GPU query (index, name, memory total/used in MiB, utilization %)
+GPU_QUERY_COMMAND = (
+    "nvidia-smi --query-gpu=index,name,memory.total,memory.used,utilization.gpu "
+    "--format=csv,noheader,nounits"
+)
+
+# Separates the GPU CSV from the agent output when both run in one command
+GPU_OUTPUT_BOUNDARY = "___BOUNDARY___"
+
+# Seconds between SSH keepalives on pooled connections (keeps NAT/firewall state alive)
+KEEPALIVE_INTERVAL = 30
+
+# Long-running GPU query helper started once per connection. It answers each
+# stdin line with one JSON line, so repeated GPU polls skip spawning nvidia-smi.
+# The first line reports whether NVML (pynvml) could be initialized. Fields a
+# device doesn't support (e.g. utilization on MIG-partitioned GPUs) come back as null.
+NVML_HELPER_SCRIPT = """
+import json, sys
+try:
+    import pynvml
+    pynvml.nvmlInit()
+except Exception as e:
+    print(json.dumps({"error": str(e)}), flush=True)
+    sys.exit(0)
+print(json.dumps({"ready": True}), flush=True)
+
+def field(query, handle):
+    try:
+        return query(handle)
+    except pynvml.NVMLError:
+        return None
+
+for _ in sys.stdin:
+    gpus = []
+    for i in range(pynvml.nvmlDeviceGetCount()):
+        handle = pynvml.nvmlDeviceGetHandleByIndex(i)
+        name = field(pynvml.nvmlDeviceGetName, handle) or "N/A"
+        if isinstance(name, bytes):
+            name = name.decode()
+        mem = field(pynvml.nvmlDeviceGetMemoryInfo, handle)
+        util = field(pynvml.nvmlDeviceGetUtilizationRates, handle)
+        gpus.append([
+            i,
+            name,
+            None if mem is None else mem.total >> 20,
+            None if mem is None else mem.used >> 20,
+            None if util is None else util.gpu,
+        ])
+    print(json.dumps({"gpus": gpus}), flush=True)
+"""
+
+
+def _fast_copy(src: Path, dst: Path):
+    """
+    Copy a file's contents, permission bits and mtime, in-kernel where possible.
+
+    Uses os.copy_file_range (zero-copy on Linux when the filesystem supports it),
+    falling back to a 1 MiB buffered copy.
+
+    Args:
+        src: Source file
+        dst: Destination file (created or truncated)
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        st = os.fstat(fsrc.fileno())
+        copied = False
+        if hasattr(os, "copy_file_range"):
+            try:
+                remaining = st.st_size
+                while remaining > 0:
+                    n = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if n == 0:
+                        break
+                    remaining -= n
+                copied = remaining == 0
+            except OSError:
+                # Unsupported across these filesystems; restart with a userspace copy
+                fsrc.seek(0)
+                fdst.seek(0)
+                fdst.truncate()
+        if not copied:
+            shutil.copyfileobj(fsrc, fdst, length=1 << 20)
+    os.chmod(dst, stat.S_IMODE(st.st_mode))
+    os.utime(dst, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+
+def _parse_int(value: str) -> Optional[int]:
+    """Parse an nvidia-smi number; unsupported fields ("[N/A]", "[Not Supported]") become None"""
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
 
-@dataclass
-class GPUInfo:
-    """Information about a GPU"""
+class GPUInfo(NamedTuple):
+    """Information about a GPU (memory in MiB, utilization in percent)"""
     index: int
     name: str
-    memory_total: str
-    memory_used: str
-    utilization: str
+    memory_total_mib: Optional[int]
+    memory_used_mib: Optional[int]
+    utilization_pct: Optional[int]
+
+    @property
+    def memory_total(self) -> str:
+        return "N/A" if self.memory_total_mib is None else f"{self.memory_total_mib} MiB"
+
+    @property
+    def memory_used(self) -> str:
+        return "N/A" if self.memory_used_mib is None else f"{self.memory_used_mib} MiB"
+
+    @property
+    def utilization(self) -> str:
+        return "N/A" if self.utilization_pct is None else f"{self.utilization_pct}%"
+
+
+def _build_env_prefix(environment: Optional[Dict[str, str]], path_ok: bool = False) -> str:
+    """
+    Build the shell prefix that exports an environment on the remote host.
+
+    Args:
+        environment: Optional environment variables
+        path_ok: Remote PATH already has the default directories, so they are not re-added
+
+    Returns:
+        Prefix ending in " && " ready to prepend to a command, or "" if nothing is exported
+    """
+    # Ensure basic PATH includes common directories for standard commands
+    # This handles cases where non-interactive SSH shells have minimal PATH.
+    # Each variable gets its own export so values can reference variables
+    # exported before them (e.g. PATH=$CUDA_HOME/bin:$PATH); a caller PATH that
+    # extends $PATH absorbs the default PATH instead of needing an export of its own.
+    environment = dict(environment or {})
+    if not path_ok:
+        if "$PATH" in environment.get("PATH", ""):
+            environment["PATH"] = environment["PATH"].replace("$PATH", f"{DEFAULT_REMOTE_PATH}:$PATH")
+        else:
+            environment = {"PATH": f"{DEFAULT_REMOTE_PATH}:$PATH", **environment}
+
+    # Build environment prefix
+    exports = []
+    for k, v in environment.items():
+        # Don't quote values that contain shell variables like $PATH
+        # as we want them to expand
+        if "$" in v:
+            exports.append(f"export {k}={v}")
+        else:
+            exports.append(f"export {k}={shlex.quote(v)}")
+
+    return " && ".join(exports) + " && " if exports else ""
+
+
+def _parse_gpu_csv(stdout: str) -> List["GPUInfo"]:
+    """
+    Parse nvidia-smi index,name,memory.total,memory.used,utilization.gpu CSV output.
+
+    Args:
+        stdout: Output of nvidia-smi --format=csv,noheader,nounits
+
+    Returns:
+        List of GPUInfo objects
+    """
+    return [
+        GPUInfo(int(row[0]), row[1], _parse_int(row[2]), _parse_int(row[3]), _parse_int(row[4]))
+        for row in csv.reader(io.StringIO(stdout), skipinitialspace=True)
+        if len(row) >= 5
+    ]
+
+
+class _TransportClient:
+    """
+    Minimal SSHClient stand-in over a directly negotiated paramiko Transport.
+
+    Exposes only what SSHBackend uses (get_transport, exec_command, open_sftp, close),
+    plus run_in_shell() for short commands over one long-lived shell channel.
+    """
+
+    def __init__(self, transport: "paramiko.Transport"):
+        self._transport = transport
+        self._pinned_sftp = None
+        # Long-lived remote shell for run_in_shell(), opened on first use
+        self._shell = None
+        self._shell_lock = threading.Lock()
+        # True when the remote shell's PATH already contains DEFAULT_REMOTE_PATH
+        self._path_ok = False
+
+    def get_transport(self) -> "paramiko.Transport":
+        return self._transport
+
+    def exec_command(self, command: str, timeout: Optional[float] = None):
+        """Run a command on a new channel; returns (stdin, stdout, stderr) file objects like SSHClient"""
+        channel = self._transport.open_session()
+        channel.settimeout(timeout)
+        channel.exec_command(command)  # nosec B601 - callers pass intended remote commands
+        return channel.makefile_stdin("wb"), channel.makefile("r"), channel.makefile_stderr("r")
+
+    def open_sftp(self) -> "paramiko.SFTPClient":
+        return self._transport.open_sftp_client()
+
+    def run_in_shell(self, command: str, timeout: float = 300) -> Tuple[int, str, str]:
+        """
+        Run a command in the connection's long-lived shell instead of a new channel.
+
+        Saves the channel open/exec/close round trips of exec_command for repeated
+        short commands. Each command runs in a subshell with stdin from /dev/null
+        (so it can't consume or exit the shell), and is framed by a unique marker
+        on stdout (followed by the exit code) and on stderr.
+
+        Args:
+            command: Command to run
+            timeout: Seconds to wait for the command to finish
+
+        Returns:
+            Tuple of (exit_code, stdout, stderr)
+
+        Raises:
+            TimeoutError: If the command does not finish in time (the shell is discarded)
+            ConnectionError: If the remote shell exits unexpectedly
+        """
+        marker = f"__FORK_TERMINAL_END_{uuid.uuid4().hex}__"
+        end = marker.encode()
+        with self._shell_lock:
+            if self._shell is None or self._shell.closed or self._shell.exit_status_ready():
+                self._shell = self._transport.open_session()
+                self._shell.exec_command("exec /bin/sh")  # nosec B601 - fixed shell, commands framed below
+            shell = self._shell
+            try:
+                shell.sendall(
+                    f"( {command}\n) < /dev/null; printf '%s%d\\n' {marker} $?; "
+                    f"printf '%s\\n' {marker} >&2\n".encode()
+                )
+                stdout_buf, stderr_buf = bytearray(), bytearray()
+                deadline = time.monotonic() + timeout
+                while True:
+                    while shell.recv_ready():
+                        stdout_buf += shell.recv(65536)
+                    while shell.recv_stderr_ready():
+                        stderr_buf += shell.recv_stderr(65536)
+                    idx = stdout_buf.rfind(end)
+                    if idx != -1 and stdout_buf.endswith(b"\n") and stderr_buf.endswith(end + b"\n"):
+                        break
+                    if shell.exit_status_ready() and not shell.recv_ready() and not shell.recv_stderr_ready():
+                        raise ConnectionError("Remote shell exited")
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"Command timed out after {timeout}s")
+                    select.select([shell], [], [], 1.0)
+            except Exception:
+                self._close_shell()
+                raise
+        return (
+            int(stdout_buf[idx + len(end):]),
+            stdout_buf[:idx].decode("utf-8", errors="replace"),
+            stderr_buf[:-len(end) - 1].decode("utf-8", errors="replace")
+        )
+
+    def _close_shell(self):
+        """Close the long-lived shell channel, if open"""
+        if self._shell is not None:
+            try:
+                self._shell.close()
+            except Exception:  # nosec B110 - best-effort cleanup, channel may already be dead
+                pass
+            self._shell = None
+
+    def close(self):
+        self._close_shell()
+        self._transport.close()
+
+
+# Live backends, drained once at interpreter exit; weak so dropped backends don't pile up
+_live_backends: "weakref.WeakSet" = weakref.WeakSet()
+
+
+@atexit.register
+def _close_backends_at_exit():
+    """Close the pooled connections of every backend still alive at interpreter exit"""
+    for backend in list(_live_backends):
+        backend.close_all_connections()
 
 
 class SSHBackend:
     """Manages SSH connections and remote execution"""
 
-    def __init__(self, verbose: bool = True):
+    # Overlaps GPU detection with local credential resolution in execute()
+    _io_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="ssh-io")
+
+    # Keychain passphrases per key path, shared by all backends in the process so
+    # the keychain is asked once; wiped by close_all_connections()
+    _passphrases: Dict[str, str] = {}
+
+    def __init__(self, verbose: bool = True, pool_size: int = 32):
         """
         Initialize SSH backend.
 
         Args:
             verbose: Print status messages
+            pool_size: Maximum pooled connections; the least recently used is closed beyond this
         """
         self.verbose = verbose
+        self.pool_size = pool_size
         self.resolver = CredentialResolver()
         self.config_manager = SSHHostConfigManager()
-        self._connections: Dict[str, "paramiko.SSHClient"] = {}  # Connection pool
+        # Connection pool in least- to most-recently-used order
+        self._connections: "OrderedDict[str, _TransportClient]" = OrderedDict()
+        # Per-host NVML helper (stdin, stdout), or None when NVML is unavailable on the host
+        self._nvml_helpers: Dict[str, Optional[tuple]] = {}
+        # Per-host (index, name, memory_total) rows from nvidia-smi; these never change
+        self._gpu_static_cache: Dict[str, List[Tuple[int, str, Optional[int]]]] = {}
+        # Decrypted private keys per key path, shared by all connections using the key
+        self._pkey_cache: Dict[str, "paramiko.PKey"] = {}
+        # Resolved private key path per configured key_path (None = default lookup)
+        self._key_path_cache: Dict[Optional[str], Path] = {}
+        # Compiled export prefix per distinct environment (host env + agent key)
+        self._env_prefix_cache: Dict[Tuple[bool, tuple], str] = {}
         self._ensure_paramiko_available()
 
+        # Parse known_hosts once and share it with every new connection
+        self._host_keys = self.paramiko.HostKeys()
+        known_hosts = Path.home() / ".ssh" / "known_hosts"
+        if known_hosts.exists():
+            try:
+                self._host_keys.load(str(known_hosts))
+            except Exception:  # nosec B110 - unreadable known_hosts rejects unknown hosts anyway
+                pass
+
+        # Pooled connections stay open between execute() calls; close them at exit
+        # (weakly referenced so the hook doesn't keep the backend alive)
+        _live_backends.add(self)
+
     def _ensure_paramiko_available(self):
         """Ensure Paramiko SSH library is installed"""
         try:
@@ -65,7 +391,12 @@ class SSHBackend:
             print("  pip install paramiko")
             sys.exit(1)
 
-    def _get_connection(self, host_config: SSHHostConfig) -> "paramiko.SSHClient":
+    @staticmethod
+    def _host_key(host_config: SSHHostConfig) -> str:
+        """Pool key for a host"""
+        return f"{host_config.user}@{host_config.hostname}:{host_config.port}"
+
+    def _get_connection(self, host_config: SSHHostConfig) -> "_TransportClient":
         """
         Get or create an SSH connection for a host.
 
@@ -75,9 +406,9 @@ class SSHBackend:
             host_config: Host configuration
 
         Returns:
-            Connected SSHClient
+            Connected client (pooled)
         """
-        host_key = f"{host_config.user}@{host_config.hostname}:{host_config.port}"
+        host_key = self._host_key(host_config)
 
         # Check for existing connection
         if host_key in self._connections:
@@ -86,79 +417,203 @@ class SSHBackend:
             try:
                 transport = client.get_transport()
                 if transport and transport.is_active():
+                    self._connections.move_to_end(host_key)
                     return client
             except Exception:  # nosec B110 - connection check failure is expected for stale connections
                 pass
             # Connection dead, remove from pool
             del self._connections[host_key]
 
-        # Create new connection
-        client = self.paramiko.SSHClient()
-
-        # Load system host keys
-        client.load_system_host_keys()
-        # Also load from known_hosts
-        known_hosts = Path.home() / ".ssh" / "known_hosts"
-        if known_hosts.exists():
+        # Resolve SSH key (once per configured key path)
+        key_path = self._key_path_cache.get(host_config.key_path)
+        if key_path is None:
             try:
-                client.load_host_keys(str(known_hosts))
-            except Exception:  # nosec B110 - non-critical: system keys already loaded
-                pass
-
-        # Set policy to reject unknown hosts (security)
-        client.set_missing_host_key_policy(self.paramiko.RejectPolicy())
-
-        # Resolve SSH key
-        try:
-            key_path, _ = self.resolver.get_ssh_key_path(
-                explicit_path=None,
-                host_config_path=host_config.key_path,
-                verbose=self.verbose
-            )
-        except CredentialNotFoundError as e:
-            raise ConnectionError(f"SSH key not found: {e}")
-
-        # Check if key needs passphrase
-        passphrase = None
-        if self.resolver.check_ssh_key_encrypted(key_path):
-            passphrase = self.resolver.get_ssh_passphrase(key_path, verbose=self.verbose)
-            if not passphrase:
-                raise ConnectionError(
-                    f"SSH key {key_path} is encrypted but passphrase not found in keychain.\n"
-                    "Add passphrase to keychain with:\n"
-                    f"  ssh-add --apple-use-keychain {key_path}"
+                key_path, _ = self.resolver.get_ssh_key_path(
+                    explicit_path=None,
+                    host_config_path=host_config.key_path,
+                    verbose=self.verbose
                 )
+            except CredentialNotFoundError as e:
+                raise ConnectionError(f"SSH key not found: {e}")
+            self._key_path_cache[host_config.key_path] = key_path
+
+        # Load (and decrypt) the key once; later connections reuse the PKey
+        pkey = self._load_pkey(key_path)
 
         # Connect
         if self.verbose:
             print(f"Connecting to {host_config.user}@{host_config.hostname}...")
 
         try:
-            client.connect(
-                hostname=host_config.hostname,
-                port=host_config.port,
-                username=host_config.user,
-                key_filename=str(key_path),
-                passphrase=passphrase,
-                timeout=30,
-                allow_agent=True,
-                look_for_keys=False
-            )
-        except self.paramiko.ssh_exception.SSHException as e:
+            transport = self._connect_transport(host_config, pkey)
+        except (self.paramiko.ssh_exception.SSHException, OSError) as e:
             raise ConnectionError(f"SSH connection failed: {e}")
+        client = _TransportClient(transport)
+        client._path_ok = self._probe_path(client)
 
-        # Store in pool
+        # Larger window/packet size for channels opened from now on (SFTP, commands)
+        transport.default_window_size = CHANNEL_WINDOW_SIZE
+        transport.default_max_packet_size = CHANNEL_MAX_PACKET_SIZE
+        transport.set_keepalive(KEEPALIVE_INTERVAL)
+
+        # Store in pool, closing the least recently used connections beyond pool_size
         self._connections[host_key] = client
+        while len(self._connections) > self.pool_size:
+            self._close_host(next(iter(self._connections)))
 
         if self.verbose:
             print(f"Connected to {host_config.hostname}")
 
         return client
 
+    def _connect_transport(self, host_config: SSHHostConfig, pkey: "paramiko.PKey") -> "paramiko.Transport":
+        """
+        Open an authenticated SSH transport without SSHClient's connect overhead.
+
+        The server key is checked against the known_hosts keys loaded in __init__
+        (unknown or mismatched hosts are rejected), then the cached key is tried,
+        followed by any ssh-agent keys.
+
+        Args:
+            host_config: Host configuration
+            pkey: Loaded private key
+
+        Returns:
+            Authenticated Transport
+
+        Raises:
+            paramiko.SSHException: On host key or authentication failure
+            OSError: If the TCP connection fails
+        """
+        paramiko = self.paramiko
+        sock = socket.create_connection((host_config.hostname, host_config.port), timeout=30)
+        transport = paramiko.Transport(sock)
+        try:
+            host_id = host_config.hostname if host_config.port == 22 else f"[{host_config.hostname}]:{host_config.port}"
+            known = self._host_keys.lookup(host_id)
+            if known:
+                # Like SSHClient.connect: offer the known_hosts key types first so the
+                # server presents a key we can check (paramiko would otherwise pick its
+                # own preference, e.g. ed25519, for a host only known by ecdsa/rsa)
+                options = transport.get_security_options()
+                preferred = []
+                for key_type in known.keys():
+                    if key_type == "ssh-rsa":
+                        preferred.extend(("rsa-sha2-512", "rsa-sha2-256", "ssh-rsa"))
+                    else:
+                        preferred.append(key_type)
+                preferred = [key_type for key_type in preferred if key_type in options.key_types]
+                options.key_types = preferred + [t for t in options.key_types if t not in preferred]
+
+            transport.start_client(timeout=30)
+
+            # Same rule as RejectPolicy: the host must already be in known_hosts
+            server_key = transport.get_remote_server_key()
+            known_key = known.get(server_key.get_name()) if known else None
+            if known_key is None:
+                raise paramiko.SSHException(f"Server {host_id} not found in known_hosts")
+            if known_key != server_key:
+                raise paramiko.BadHostKeyException(host_id, server_key, known_key)
+
+            try:
+                transport.auth_publickey(host_config.user, pkey)
+            except paramiko.AuthenticationException:
+                for agent_key in paramiko.Agent().get_keys():
+                    try:
+                        transport.auth_publickey(host_config.user, agent_key)
+                        break
+                    except paramiko.AuthenticationException:
+                        continue
+                else:
+                    raise
+            return transport
+        except Exception:
+            transport.close()
+            raise
+
+    @staticmethod
+    def _probe_path(client: "_TransportClient") -> bool:
+        """
+        Check once per connection whether the remote PATH already has the default directories.
+
+        Args:
+            client: Newly connected client
+
+        Returns:
+            True if every DEFAULT_REMOTE_PATH directory is already on the remote PATH
+        """
+        try:
+            _, stdout, _ = client.run_in_shell("echo $PATH", timeout=10)
+            remote_dirs = set(stdout.strip().split(":"))
+            return set(DEFAULT_REMOTE_PATH.split(":")) <= remote_dirs
+        except Exception:
+            return False
+
+    def _load_pkey(self, key_path: Path) -> "paramiko.PKey":
+        """
+        Load a private key, asking the keychain for a passphrase only if the key needs one.
+
+        Args:
+            key_path: Path to the SSH private key
+
+        Returns:
+            Loaded paramiko key (cached per key path)
+
+        Raises:
+            ConnectionError: If the key is encrypted without a stored passphrase or cannot be parsed
+        """
+        cache_key = str(key_path)
+        pkey = self._pkey_cache.get(cache_key)
+        if pkey is not None:
+            return pkey
+
+        key_classes = [
+            cls for cls in (
+                getattr(self.paramiko, name, None)
+                for name in ("Ed25519Key", "ECDSAKey", "RSAKey", "DSSKey")
+            )
+            if cls is not None
+        ]
+
+        def load(passphrase: Optional[str] = None) -> "paramiko.PKey":
+            for key_class in key_classes:
+                try:
+                    return key_class.from_private_key_file(cache_key, password=passphrase)
+                except self.paramiko.PasswordRequiredException:
+                    raise
+                except self.paramiko.SSHException:
+                    continue  # Not this key type
+            raise ConnectionError(f"Unsupported or invalid SSH key: {key_path}")
+
+        try:
+            pkey = load()
+        except self.paramiko.PasswordRequiredException:
+            passphrase = self._passphrases.get(cache_key)
+            if not passphrase:
+                passphrase = self.resolver.get_ssh_passphrase(key_path, verbose=self.verbose)
+            if not passphrase:
+                raise ConnectionError(
+                    f"SSH key {key_path} is encrypted but passphrase not found in keychain.\n"
+                    "Add passphrase to keychain with:\n"
+                    f"  ssh-add --apple-use-keychain {key_path}"
+                )
+            pkey = load(passphrase)
+            SSHBackend._passphrases[cache_key] = passphrase
+
+        self._pkey_cache[cache_key] = pkey
+        return pkey
+
     def _close_connection(self, host_config: SSHHostConfig):
         """Close connection for a host"""
-        host_key = f"{host_config.user}@{host_config.hostname}:{host_config.port}"
+        self._close_host(self._host_key(host_config))
+
+    def _close_host(self, host_key: str):
+        """Close the pooled connection (and its helper channels) for a host key"""
+        if self._nvml_helpers.get(host_key) is not None:
+            # The helper dies with the connection; NVML-unavailable markers are kept
+            del self._nvml_helpers[host_key]
         if host_key in self._connections:
+            self._close_pinned_sftp(self._connections[host_key])
             try:
                 self._connections[host_key].close()
             except Exception:  # nosec B110 - best-effort cleanup, connection may already be dead
@@ -166,20 +621,47 @@ class SSHBackend:
             del self._connections[host_key]
 
     def close_all_connections(self):
-        """Close all pooled connections"""
+        """Close all pooled connections and forget cached key material"""
         for client in self._connections.values():
+            self._close_pinned_sftp(client)
             try:
                 client.close()
             except Exception:  # nosec B110 - best-effort cleanup during shutdown
                 pass
         self._connections.clear()
+        self._nvml_helpers = {k: v for k, v in self._nvml_helpers.items() if v is None}
+        self._key_path_cache.clear()
+        self._env_prefix_cache.clear()
+        self._pkey_cache.clear()
+        SSHBackend._passphrases.clear()
+
+    def _env_prefix(self, environment: Optional[Dict[str, str]], path_ok: bool = False) -> str:
+        """
+        Build (once per distinct environment) the shell prefix that exports it.
+
+        Args:
+            environment: Optional environment variables
+            path_ok: Remote PATH already has the default directories, so they are not re-added
+
+        Returns:
+            Prefix ending in " && " ready to prepend to a command, or "" if nothing is exported
+        """
+        cache_key = (path_ok, tuple(environment.items()) if environment else ())
+        prefix = self._env_prefix_cache.get(cache_key)
+        if prefix is not None:
+            return prefix
+
+        prefix = _build_env_prefix(environment, path_ok)
+        self._env_prefix_cache[cache_key] = prefix
+        return prefix
 
     def _run_command(
         self,
-        client: "paramiko.SSHClient",
+        client: "_TransportClient",
         command: str,
         environment: Optional[Dict[str, str]] = None,
-        timeout: int = 300
+        timeout: int = 300,
+        persistent: bool = False
     ) -> Tuple[int, str, str]:
         """
         Run a command on the remote host.
@@ -189,44 +671,109 @@ class SSHBackend:
             command: Command to run
             environment: Optional environment variables
             timeout: Command timeout in seconds
+            persistent: Run in the connection's long-lived shell rather than a new
+                channel (for short, non-interactive commands)
 
         Returns:
             Tuple of (exit_code, stdout, stderr)
         """
-        # Ensure basic PATH includes common directories for standard commands
-        # This handles cases where non-interactive SSH shells have minimal PATH
-        default_path = "/usr/local/bin:/usr/bin:/bin:/usr/sbin:/sbin"
-        path_setup = f"export PATH={default_path}:$PATH"
-
-        # Build environment prefix
-        env_parts = [path_setup]  # Start with default PATH
-        if environment:
-            for k, v in environment.items():
-                # Don't quote values that contain shell variables like $PATH
-                # as we want them to expand
-                if "$" in v:
-                    env_parts.append(f"export {k}={v}")
-                else:
-                    env_parts.append(f"export {k}={shlex.quote(v)}")
-
-        env_prefix = " && ".join(env_parts) + " && "
-        full_command = f"{env_prefix}{command}"
+        full_command = f"{self._env_prefix(environment, getattr(client, '_path_ok', False))}{command}"
 
         try:
+            if persistent:
+                return client.run_in_shell(full_command, timeout=timeout)
+
             # Security note: This is intentional remote command execution.
             # Environment values (except shell variables) are sanitized with shlex.quote.
             # The command itself comes from user input and is executed as intended.
-            _, stdout, stderr = client.exec_command(full_command, timeout=timeout)  # nosec B601
-            exit_code = stdout.channel.recv_exit_status()
-            stdout_text = stdout.read().decode("utf-8", errors="replace")
-            stderr_text = stderr.read().decode("utf-8", errors="replace")
-            return exit_code, stdout_text, stderr_text
+            channel = client.get_transport().open_session()
+            try:
+                channel.exec_command(full_command)  # nosec B601
+                # Drain stdout and stderr as data arrives so a chatty stream can't
+                # fill its window and stall the remote process
+                stdout_buf, stderr_buf = bytearray(), bytearray()
+                deadline = time.monotonic() + timeout
+                while True:
+                    while channel.recv_ready():
+                        stdout_buf += channel.recv(65536)
+                    while channel.recv_stderr_ready():
+                        stderr_buf += channel.recv_stderr(65536)
+                    if channel.exit_status_ready() and not channel.recv_ready() and not channel.recv_stderr_ready():
+                        break
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"Command timed out after {timeout}s")
+                    select.select([channel], [], [], 1.0)
+                exit_code = channel.recv_exit_status()
+            finally:
+                channel.close()
+            return (
+                exit_code,
+                stdout_buf.decode("utf-8", errors="replace"),
+                stderr_buf.decode("utf-8", errors="replace")
+            )
         except Exception as e:
             return 1, "", str(e)
 
+    def _query_nvml(self, client: "_TransportClient", host_key: str) -> Optional[List[list]]:
+        """
+        Query GPUs through the host's persistent NVML helper, starting it on first use.
+
+        Args:
+            client: SSH client
+            host_key: Pool key for the host
+
+        Returns:
+            List of [index, name, memory_total_mib, memory_used_mib, utilization] rows,
+            or None if NVML is unavailable and nvidia-smi should be used instead
+        """
+        if host_key in self._nvml_helpers and self._nvml_helpers[host_key] is None:
+            return None
+
+        helper = self._nvml_helpers.get(host_key)
+        if helper is not None and helper[1].channel.exit_status_ready():
+            helper = None  # Helper exited (e.g. connection was reset); restart it
+
+        channel = None if helper is None else helper[1].channel
+        try:
+            if helper is None:
+                command = (
+                    f"export PATH={DEFAULT_REMOTE_PATH}:$PATH && "
+                    f"exec python3 -u -c {shlex.quote(NVML_HELPER_SCRIPT)}"
+                )
+                stdin, stdout, _ = client.exec_command(command)  # nosec B601 - fixed helper script
+                channel = stdout.channel
+                channel.settimeout(10)
+                handshake = json.loads(stdout.readline() or "{}")
+                if not handshake.get("ready"):
+                    if self.verbose:
+                        print(f"  NVML unavailable ({handshake.get('error', 'no response')}), using nvidia-smi")
+                    self._nvml_helpers[host_key] = None
+                    return None
+                helper = (stdin, stdout)
+                self._nvml_helpers[host_key] = helper
+
+            stdin, stdout = helper
+            stdin.write('{"op": "query"}\n')
+            stdin.flush()
+            return json.loads(stdout.readline())["gpus"]
+        except Exception as e:
+            if self.verbose:
+                print(f"  NVML query failed ({e}), using nvidia-smi")
+            # Don't respawn a helper that fails on this host; close the dead channel
+            if channel is not None:
+                try:
+                    channel.close()
+                except Exception:  # nosec B110 - best-effort cleanup, channel may already be gone
+                    pass
+            self._nvml_helpers[host_key] = None
+            return None
+
     def detect_gpus(self, host_config: SSHHostConfig) -> List[GPUInfo]:
         """
-        Detect GPUs on the remote host using nvidia-smi.
+        Detect GPUs on the remote host.
+
+        Uses a persistent NVML helper over the pooled connection when pynvml is
+        available on the host, falling back to nvidia-smi otherwise.
 
         Args:
             host_config: Host configuration
@@ -239,30 +786,39 @@ class SSHBackend:
 
         try:
             client = self._get_connection(host_config)
-            exit_code, stdout, stderr = self._run_command(
-                client,
-                "nvidia-smi --query-gpu=index,name,memory.total,memory.used,utilization.gpu --format=csv,noheader,nounits"
-            )
+            host_key = self._host_key(host_config)
+            rows = self._query_nvml(client, host_key)
+            if rows is not None:
+                return list(map(GPUInfo._make, rows))
+
+            # Known host: only query the fields that change
+            static = self._gpu_static_cache.get(host_key)
+            if static is not None:
+                exit_code, stdout, _ = self._run_command(
+                    client,
+                    "nvidia-smi --query-gpu=memory.used,utilization.gpu --format=csv,noheader,nounits",
+                    persistent=True
+                )
+                if exit_code == 0:
+                    volatile = [row for row in csv.reader(io.StringIO(stdout), skipinitialspace=True) if row]
+                    if len(volatile) == len(static) and all(len(row) >= 2 for row in volatile):
+                        return [
+                            GPUInfo(*static_row, _parse_int(row[0]), _parse_int(row[1]))
+                            for static_row, row in zip(static, volatile)
+                        ]
+                # GPU set changed or query failed; fall through to a full query
+                del self._gpu_static_cache[host_key]
+
+            exit_code, stdout, stderr = self._run_command(client, GPU_QUERY_COMMAND, persistent=True)
 
             if exit_code != 0:
                 if self.verbose:
                     print(f"  GPU detection failed: {stderr}")
                 return []
 
-            gpus = []
-            for line in stdout.strip().split("\n"):
-                if not line.strip():
-                    continue
-                parts = [p.strip() for p in line.split(",")]
-                if len(parts) >= 5:
-                    gpus.append(GPUInfo(
-                        index=int(parts[0]),
-                        name=parts[1],
-                        memory_total=f"{parts[2]} MiB",
-                        memory_used=f"{parts[3]} MiB",
-                        utilization=f"{parts[4]}%"
-                    ))
+            gpus = _parse_gpu_csv(stdout)
 
+            self._gpu_static_cache[host_key] = [gpu[:3] for gpu in gpus]
             return gpus
 
         except Exception as e:
@@ -307,8 +863,7 @@ class SSHBackend:
                         print(f"  Skipping suspicious path: {local_path}")
                     return None
 
-                import shutil
-                shutil.copy2(local_path, dest_path)
+                _fast_copy(local_path, dest_path)
 
                 # Return the remote path
                 remote_path = f"{samba.remote_path}/{local_path.name}"
@@ -328,9 +883,50 @@ class SSHBackend:
                 print(f"  Samba transfer failed: {e}")
             return None
 
+    @staticmethod
+    def _close_pinned_sftp(client: "_TransportClient"):
+        """Close the client's pinned SFTP session, if any"""
+        sftp = getattr(client, "_pinned_sftp", None)
+        client._pinned_sftp = None
+        if sftp is not None:
+            try:
+                sftp.close()
+            except Exception:  # nosec B110 - best-effort cleanup, channel may already be closed
+                pass
+
+    @staticmethod
+    def _get_sftp(client: "_TransportClient") -> "paramiko.SFTPClient":
+        """Return the SFTP session pinned on the pooled connection, opening it if needed"""
+        sftp = getattr(client, "_pinned_sftp", None)
+        if sftp is None or sftp.sock.closed:
+            sftp = client.open_sftp()
+            client._pinned_sftp = sftp
+        return sftp
+
+    def _upload_prompt(self, client: "_TransportClient", prompt: str) -> Optional[str]:
+        """
+        Upload a long prompt to a remote temp file.
+
+        Args:
+            client: SSH client
+            prompt: Prompt text
+
+        Returns:
+            Remote path of the prompt file, or None if the upload failed
+        """
+        remote_path = f"/tmp/fork-terminal-prompt-{uuid.uuid4().hex}.txt"  # nosec B108 - remote temp file, removed after the run
+        try:
+            self._get_sftp(client).putfo(io.BytesIO(prompt.encode("utf-8")), remote_path, confirm=False)
+            return remote_path
+        except Exception as e:
+            self._close_pinned_sftp(client)
+            if self.verbose:
+                print(f"  Prompt upload failed ({e}), passing prompt inline")
+            return None
+
     def _transfer_file_sftp(
         self,
-        client: "paramiko.SSHClient",
+        client: "_TransportClient",
         local_path: Path,
         remote_path: str,
         direction: str = "upload"
@@ -348,20 +944,22 @@ class SSHBackend:
             True if successful
         """
         try:
-            sftp = client.open_sftp()
-            try:
-                if direction == "upload":
-                    sftp.put(str(local_path), remote_path)
-                    if self.verbose:
-                        print(f"  SFTP uploaded: {local_path.name} -> {remote_path}")
-                else:  # download
-                    sftp.get(remote_path, str(local_path))
-                    if self.verbose:
-                        print(f"  SFTP downloaded: {remote_path} -> {local_path.name}")
-                return True
-            finally:
-                sftp.close()
+            sftp = self._get_sftp(client)
+
+            if direction == "upload":
+                # Pipelined writes; confirm=False skips the post-upload stat round trip
+                with open(local_path, "rb", buffering=0) as f:
+                    sftp.putfo(f, remote_path, file_size=os.fstat(f.fileno()).st_size, confirm=False)
+                if self.verbose:
+                    print(f"  SFTP uploaded: {local_path.name} -> {remote_path}")
+            else:  # download
+                sftp.get(remote_path, str(local_path))
+                if self.verbose:
+                    print(f"  SFTP downloaded: {remote_path} -> {local_path.name}")
+            return True
         except Exception as e:
+            # The session may be broken; open a fresh one next time
+            self._close_pinned_sftp(client)
             if self.verbose:
                 print(f"  SFTP transfer failed: {e}")
             return False
@@ -410,12 +1008,13 @@ class SSHBackend:
 
         return None
 
+    @staticmethod
     def _build_agent_command(
-        self,
         agent: str,
         prompt: str,
         model: Optional[str] = None,
-        file_paths: Optional[List[str]] = None
+        file_paths: Optional[List[str]] = None,
+        prompt_file: Optional[str] = None
     ) -> str:
         """
         Build command for AI agent execution.
@@ -425,18 +1024,24 @@ class SSHBackend:
             prompt: User prompt
             model: Optional model override
             file_paths: Optional list of remote file paths
+            prompt_file: Optional remote file holding the full prompt, read by the
+                remote shell instead of embedding prompt in the command
 
         Returns:
             Shell command string
         """
-        # Handle file context
-        if file_paths:
-            file_list = ", ".join([Path(fp).name for fp in file_paths])
-            file_context = f"\n\nFiles available: {file_list}"
-            prompt = prompt + file_context
+        if prompt_file:
+            # The remote shell substitutes the file contents as a single argument
+            safe_prompt = f'"$(cat {shlex.quote(prompt_file)})"'
+        else:
+            # Handle file context
+            if file_paths:
+                file_list = ", ".join([Path(fp).name for fp in file_paths])
+                file_context = f"\n\nFiles available: {file_list}"
+                prompt = prompt + file_context
 
-        # Escape prompt for shell
-        safe_prompt = shlex.quote(prompt)
+            # Escape prompt for shell
+            safe_prompt = shlex.quote(prompt)
 
         if agent == "claude":
             model_flag = f"--model {model}" if model else ""
@@ -459,7 +1064,7 @@ class SSHBackend:
         agent: Optional[str] = None,
         model: Optional[str] = None,
         working_dir: Optional[str] = None,
-        auto_close: bool = True
+        auto_close: bool = False
     ) -> dict:
         """
         Execute a command or AI agent on a remote SSH host.
@@ -470,7 +1075,8 @@ class SSHBackend:
             agent: Agent name ("claude", "gemini", "codex") or None for raw command
             model: Optional model override for agents
             working_dir: Local working directory for file resolution
-            auto_close: Close connection after execution (default: True)
+            auto_close: Close connection after execution (default: False, keeping it
+                pooled for the next call; pass True for one-shot use)
 
         Returns:
             Dictionary with execution results
@@ -499,9 +1105,19 @@ class SSHBackend:
             # Connect
             client = self._get_connection(host_config)
 
+            # Agent runs fetch GPU info in the same command as the agent (see below);
+            # otherwise GPU detection (remote round trip) and credential lookup
+            # (local keychain) are independent, so run them concurrently
+            bundle_gpus = bool(host_config.gpu_enabled and agent)
+            gpu_future = (
+                self._io_pool.submit(self.detect_gpus, host_config)
+                if host_config.gpu_enabled and not bundle_gpus else None
+            )
+            cred_future = self._io_pool.submit(self.resolver.get_credential, agent, verbose=False) if agent else None
+
             # Detect GPUs if enabled
-            if host_config.gpu_enabled:
-                gpus = self.detect_gpus(host_config)
+            if gpu_future:
+                gpus = gpu_future.result()
                 result["gpu_info"] = gpus
                 if gpus and self.verbose:
                     print(f"  GPUs detected: {len(gpus)}")
@@ -525,7 +1141,7 @@ class SSHBackend:
 
                 # Resolve agent credential
                 try:
-                    api_key = self.resolver.get_credential(agent, verbose=False)
+                    api_key = cred_future.result()
                 except CredentialNotFoundError as e:
                     result["error"] = str(e)
                     return result
@@ -538,8 +1154,19 @@ class SSHBackend:
                 if agent == "codex":
                     env["OPENAI_API_KEY"] = api_key
 
+                # Long prompts go to a remote file rather than the command line
+                prompt_file = None
+                if len(prompt) > PROMPT_FILE_THRESHOLD:
+                    prompt_file = self._upload_prompt(client, prompt)
+
                 # Build agent command
-                command = self._build_agent_command(agent, prompt, model)
+                command = self._build_agent_command(agent, prompt, model, prompt_file=prompt_file)
+                if prompt_file:
+                    command = f"{command}; status=$?; rm -f {shlex.quote(prompt_file)}; exit $status"
+
+                # Query GPUs in the same round trip, ahead of a boundary line
+                if bundle_gpus:
+                    command = f"{GPU_QUERY_COMMAND} 2>/dev/null; echo '{GPU_OUTPUT_BOUNDARY}'; {command}"
 
             else:
                 # Raw command execution
@@ -558,6 +1185,20 @@ class SSHBackend:
                 timeout=300
             )
 
+            if bundle_gpus:
+                gpu_csv, found, stdout = stdout.partition(f"{GPU_OUTPUT_BOUNDARY}\n")
+                if found:
+                    gpus = _parse_gpu_csv(gpu_csv)
+                    result["gpu_info"] = gpus
+                    if gpus:
+                        self._gpu_static_cache[self._host_key(host_config)] = [gpu[:3] for gpu in gpus]
+                        if self.verbose:
+                            print(f"  GPUs detected: {len(gpus)}")
+                            for gpu in gpus:
+                                print(f"    [{gpu.index}] {gpu.name} - {gpu.memory_used}/{gpu.memory_total} ({gpu.utilization})")
+                else:
+                    stdout = gpu_csv
+
             result["success"] = exit_code == 0
             result["output"] = stdout
             if stderr:
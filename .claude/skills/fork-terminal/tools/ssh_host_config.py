@@ -5,12 +5,22 @@ Loads and manages SSH host configurations from ~/.config/fork-terminal/ssh_hosts
 Supports multiple named hosts with GPU settings and Samba share paths for file exchange.
 """
 
+import os
+import stat
+import sys
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Optional, Dict, Tuple, Iterator
 from dataclasses import dataclass, field
+from functools import lru_cache
 
 
-@dataclass
+@lru_cache(maxsize=None)
+def _expand(path: str) -> Path:
+    """Expanded Path for a configured path string (shared by hosts using the same key)"""
+    return Path(path).expanduser()
+
+
+@dataclass(slots=True, frozen=True)
 class SambaShareConfig:
     """Configuration for Samba share file transfer"""
     local_mount: str  # Local mount path (e.g., /Volumes/DGX-Share)
@@ -18,10 +28,14 @@ class SambaShareConfig:
 
     def is_available(self) -> bool:
         """Check if the local mount is accessible"""
-        return Path(self.local_mount).exists() and Path(self.local_mount).is_dir()
+        # One stat (each is a round trip on a network mount) covers existence and type
+        try:
+            return stat.S_ISDIR(os.stat(self.local_mount).st_mode)
+        except OSError:
+            return False
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class SSHHostConfig:
     """Configuration for a single SSH host"""
     name: str
@@ -37,10 +51,129 @@ class SSHHostConfig:
     def get_key_path(self) -> Optional[Path]:
         """Get expanded key path if configured"""
         if self.key_path:
-            return Path(self.key_path).expanduser()
+            return _expand(self.key_path)
         return None
 
 
+# PyYAML module, imported on first use so callers that only build configs don't pay for it
+_yaml = None
+
+
+def _get_yaml():
+    """
+    Return the yaml module, importing it once.
+
+    Raises:
+        ImportError: If PyYAML is not installed
+    """
+    global _yaml
+    if _yaml is None:
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError(
+                "PyYAML is required for SSH host configuration.\n"
+                "Install with: pip install pyyaml"
+            )
+        _yaml = yaml
+    return _yaml
+
+
+# Loader class for _iter_host_entries(), built on first use
+_host_loader_cls = None
+
+
+def _get_host_loader():
+    """
+    Return a safe loader class that can compose one node at a time.
+
+    Uses the libyaml event parser with PyYAML's composer when available
+    (CSafeLoader composes whole documents in C only); the pure-Python
+    SafeLoader already composes node by node.
+    """
+    global _host_loader_cls
+    if _host_loader_cls is None:
+        yaml = _get_yaml()
+        try:
+            from yaml.cyaml import CParser
+        except ImportError:
+            _host_loader_cls = yaml.SafeLoader
+        else:
+            from yaml.composer import Composer
+            from yaml.constructor import SafeConstructor
+            from yaml.resolver import Resolver
+
+            class _HostLoader(CParser, Composer, SafeConstructor, Resolver):
+                def __init__(self, stream):
+                    CParser.__init__(self, stream)
+                    Composer.__init__(self)
+                    SafeConstructor.__init__(self)
+                    Resolver.__init__(self)
+
+            _host_loader_cls = _HostLoader
+    return _host_loader_cls
+
+
+def _iter_host_entries(stream) -> Optional[Iterator[Tuple[object, object]]]:
+    """
+    Stream (name, data) pairs from the top-level "hosts:" mapping of a YAML document.
+
+    Each host is composed and constructed on its own, so only one host's node tree
+    is alive at a time instead of the whole document's. Other top-level keys are
+    composed and dropped.
+
+    Args:
+        stream: Open config file
+
+    Returns:
+        Iterator over host entries, or None if the document has no "hosts:" mapping
+    """
+    yaml = _get_yaml()
+    events = yaml.events
+    loader = _get_host_loader()(stream)
+    try:
+        loader.get_event()  # StreamStart
+        if not loader.check_event(events.DocumentStartEvent):
+            return None  # Empty file
+        loader.get_event()
+        if not loader.check_event(events.MappingStartEvent):
+            return None
+        loader.get_event()
+        while not loader.check_event(events.MappingEndEvent):
+            key = loader.compose_node(None, None)
+            if getattr(key, "value", None) == "hosts" and loader.check_event(events.MappingStartEvent):
+                loader.get_event()
+                break
+            loader.compose_node(None, None)  # Value of another top-level key
+        else:
+            return None
+    except BaseException:
+        loader.dispose()
+        raise
+
+    def entries() -> Iterator[Tuple[object, object]]:
+        try:
+            while not loader.check_event(events.MappingEndEvent):
+                name = loader.construct_document(loader.compose_node(None, None))
+                data = loader.construct_document(loader.compose_node(None, None))
+                yield name, data
+        finally:
+            loader.dispose()
+
+    return entries()
+
+
+def _host_lookup_key(name: str) -> str:
+    """Lowercased, interned dict key for a host name (long names are left uninterned)"""
+    key = name.lower()
+    return sys.intern(key) if len(key) <= 100 else key
+
+
+# Raw host entries per config file, with the (st_mtime_ns, st_size) they were parsed at,
+# so managers created later in the process skip the YAML parse while the file is unchanged
+_PARSED_CACHE: Dict[Path, Tuple[Tuple[int, int], Dict[str, Tuple[str, Optional[dict]]]]] = {}
+
+
 class SSHHostConfigManager:
     """Manages SSH host configurations"""
 
@@ -54,8 +187,13 @@ class SSHHostConfigManager:
             config_path: Path to config file (defaults to ~/.config/fork-terminal/ssh_hosts.yaml)
         """
         self.config_path = Path(config_path or self.DEFAULT_CONFIG_PATH).expanduser()
-        self._hosts: Dict[str, SSHHostConfig] = {}
+        # Every configured host: lookup key -> (name as written, YAML mapping). Configs are
+        # built from the mapping on first get_host(); added hosts have no mapping.
+        self._raw: Dict[str, Tuple[str, Optional[dict]]] = {}
+        self._built: Dict[str, SSHHostConfig] = {}
         self._loaded = False
+        # Set once save() has made sure the config directory exists
+        self._parent_verified = False
 
     def _ensure_loaded(self):
         """Load config if not already loaded"""
@@ -69,59 +207,167 @@ class SSHHostConfigManager:
         Returns:
             True if config was loaded successfully, False if file doesn't exist
         """
-        self._hosts = {}
+        self._raw = {}
+        self._built = {}
         self._loaded = True
 
-        if not self.config_path.exists():
+        try:
+            st = self.config_path.stat()
+        except OSError:
             return False
+        stamp = (st.st_mtime_ns, st.st_size)
 
-        try:
-            import yaml
-        except ImportError:
-            raise ImportError(
-                "PyYAML is required for SSH host configuration.\n"
-                "Install with: pip install pyyaml"
-            )
+        cached = _PARSED_CACHE.get(self.config_path)
+        if cached is not None and cached[0] == stamp:
+            self._raw = dict(cached[1])
+            return True
+
+        _get_yaml()  # Raise the install hint here rather than as a load warning
 
         try:
+            # Hosts are parsed one at a time (libyaml event parser when available)
             with open(self.config_path) as f:
-                data = yaml.safe_load(f)
+                entries = _iter_host_entries(f)
+                if entries is None:
+                    return False
 
-            if not data or "hosts" not in data:
-                return False
-
-            for name, host_data in data.get("hosts", {}).items():
-                if not isinstance(host_data, dict):
-                    continue
-
-                # Parse Samba share config if present
-                samba_share = None
-                if "samba_share" in host_data and host_data["samba_share"]:
-                    samba_data = host_data["samba_share"]
-                    if isinstance(samba_data, dict) and "local_mount" in samba_data and "remote_path" in samba_data:
-                        samba_share = SambaShareConfig(
-                            local_mount=samba_data["local_mount"],
-                            remote_path=samba_data["remote_path"]
-                        )
-
-                self._hosts[name.lower()] = SSHHostConfig(
-                    name=name,
-                    hostname=host_data.get("hostname", ""),
-                    port=host_data.get("port", 22),
-                    user=host_data.get("user", "root"),
-                    key_path=host_data.get("key_path"),
-                    gpu_enabled=host_data.get("gpu_enabled", False),
-                    cuda_path=host_data.get("cuda_path"),
-                    samba_share=samba_share,
-                    environment=host_data.get("environment", {})
-                )
+                for name, host_data in entries:
+                    if not isinstance(host_data, dict):
+                        continue
+                    self._raw[_host_lookup_key(name)] = (name, host_data)
 
+            _PARSED_CACHE[self.config_path] = (stamp, dict(self._raw))
             return True
 
         except Exception as e:
             print(f"Warning: Failed to load SSH config: {e}")
+            self._raw = {}
             return False
 
+    @staticmethod
+    def _parse_host(name: str, host_data: dict) -> SSHHostConfig:
+        """
+        Build a host configuration from its YAML mapping.
+
+        Args:
+            name: Host name as written in the config
+            host_data: Mapping under the host's key
+
+        Returns:
+            SSHHostConfig
+        """
+        # Parse Samba share config if present
+        samba_share = None
+        if "samba_share" in host_data and host_data["samba_share"]:
+            samba_data = host_data["samba_share"]
+            if isinstance(samba_data, dict) and "local_mount" in samba_data and "remote_path" in samba_data:
+                samba_share = SambaShareConfig(
+                    local_mount=samba_data["local_mount"],
+                    remote_path=samba_data["remote_path"]
+                )
+
+        return SSHHostConfig(
+            name=name,
+            hostname=host_data.get("hostname", ""),
+            port=host_data.get("port", 22),
+            user=host_data.get("user", "root"),
+            key_path=host_data.get("key_path"),
+            gpu_enabled=host_data.get("gpu_enabled", False),
+            cuda_path=host_data.get("cuda_path"),
+            samba_share=samba_share,
+            environment=host_data.get("environment", {})
+        )
+
+    def _read_host_block(self, name: str) -> Optional[str]:
+        """
+        Slice one host's block out of the config text without parsing the rest.
+
+        Args:
+            name: Host name (case-insensitive)
+
+        Returns:
+            YAML text of the "<name>:" entry under "hosts:", or None if it can't be
+            isolated safely (not found, anchors/aliases/merge keys, flow style, quoted keys)
+        """
+        wanted = name.lower()
+        block: list = []
+        in_hosts = False
+        host_indent = None
+        with open(self.config_path) as f:
+            for line in f:
+                stripped = line.strip()
+                if not stripped or stripped.startswith("#"):
+                    if block:
+                        block.append(line)
+                    continue
+                indent = len(line) - len(line.lstrip(" "))
+
+                if not in_hosts:
+                    if indent == 0 and stripped.split("#", 1)[0].rstrip() == "hosts:":
+                        in_hosts = True
+                    continue
+
+                if indent == 0:
+                    break  # Left the hosts mapping
+                if host_indent is None:
+                    host_indent = indent
+
+                if block:
+                    if indent <= host_indent:
+                        break  # Next host: the wanted block is complete
+                    if "&" in stripped or "*" in stripped or "<<" in stripped:
+                        return None
+                    block.append(line)
+                elif indent == host_indent:
+                    key, sep, rest = stripped.partition(":")
+                    if sep and key.lower() == wanted:
+                        if rest.split("#", 1)[0].strip():
+                            return None  # Inline (flow-style) value
+                        block.append(line)
+                    elif key[:1] in ("'", '"', "?", "{", "-"):
+                        return None  # Quoted or complex keys could still match
+        return "".join(block) or None
+
+    def get_host_fast(self, name: str) -> Optional[SSHHostConfig]:
+        """
+        Get configuration for a named host, parsing only that host's block when possible.
+
+        Falls back to a full load when the config is already loaded or cached, or
+        when the block can't be isolated safely.
+
+        Args:
+            name: Host name (case-insensitive)
+
+        Returns:
+            SSHHostConfig or None if not found
+        """
+        if self._loaded:
+            return self.get_host(name)
+
+        try:
+            st = self.config_path.stat()
+        except OSError:
+            return None
+        cached = _PARSED_CACHE.get(self.config_path)
+        if cached is not None and cached[0] == (st.st_mtime_ns, st.st_size):
+            return self.get_host(name)
+
+        yaml = _get_yaml()
+
+        try:
+            snippet = self._read_host_block(name)
+            if snippet is not None:
+                loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+                data = yaml.load(snippet, Loader=loader)  # nosec B506 - safe loader
+                if isinstance(data, dict) and len(data) == 1:
+                    host_name, host_data = next(iter(data.items()))
+                    if isinstance(host_name, str) and isinstance(host_data, dict):
+                        return self._parse_host(host_name, host_data)
+        except Exception:  # nosec B110 - fall back to the full parse, which reports errors
+            pass
+
+        return self.get_host(name)
+
     def save(self) -> bool:
         """
         Save current host configurations to YAML file.
@@ -129,20 +375,18 @@ class SSHHostConfigManager:
         Returns:
             True if saved successfully
         """
-        try:
-            import yaml
-        except ImportError:
-            raise ImportError(
-                "PyYAML is required for SSH host configuration.\n"
-                "Install with: pip install pyyaml"
-            )
+        yaml = _get_yaml()
 
-        # Ensure config directory exists
-        self.config_path.parent.mkdir(parents=True, exist_ok=True)
+        # Ensure config directory exists (once per manager)
+        if not self._parent_verified:
+            self.config_path.parent.mkdir(parents=True, exist_ok=True)
+            self._parent_verified = True
 
         # Build data structure
         data = {"hosts": {}}
-        for name, host in self._hosts.items():
+        raw = {}
+        for key in self._raw:
+            host = self._get_built(key)
             host_data = {
                 "hostname": host.hostname,
                 "port": host.port,
@@ -164,15 +408,59 @@ class SSHHostConfigManager:
                 host_data["environment"] = host.environment
 
             data["hosts"][host.name] = host_data
+            raw[key] = (host.name, host_data)
 
         try:
-            with open(self.config_path, "w") as f:
-                yaml.dump(data, f, default_flow_style=False, sort_keys=False)
+            dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+            content = yaml.dump(data, Dumper=dumper, default_flow_style=False, sort_keys=False).encode("utf-8")
+
+            # Write a private temp file and rename it over the config, so readers never
+            # see a partially written file
+            tmp_path = f"{self.config_path}.tmp"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            try:
+                view = memoryview(content)
+                while view:
+                    view = view[os.write(fd, view):]
+                os.fsync(fd)
+                st = os.fstat(fd)
+            except BaseException:
+                os.close(fd)
+                os.unlink(tmp_path)
+                raise
+            os.close(fd)
+            os.replace(tmp_path, self.config_path)
+
+            # The file now holds exactly these hosts; cache them under its new stamp
+            _PARSED_CACHE[self.config_path] = ((st.st_mtime_ns, st.st_size), raw)
             return True
         except Exception as e:
             print(f"Error saving SSH config: {e}")
             return False
 
+    @staticmethod
+    def invalidate_cache():
+        """Forget parsed configs so the next load() re-reads the YAML"""
+        global _default_manager
+        _PARSED_CACHE.clear()
+        _default_manager = None
+
+    def _get_built(self, key: str) -> Optional[SSHHostConfig]:
+        """
+        Get the config for a lookup key, building it from its YAML mapping on first use.
+
+        Args:
+            key: Lookup key from _host_lookup_key()
+
+        Returns:
+            SSHHostConfig or None if not configured
+        """
+        host = self._built.get(key)
+        if host is None and key in self._raw:
+            name, host_data = self._raw[key]
+            host = self._built[key] = self._parse_host(name, host_data)
+        return host
+
     def get_host(self, name: str) -> Optional[SSHHostConfig]:
         """
         Get configuration for a named host.
@@ -184,7 +472,7 @@ class SSHHostConfigManager:
             SSHHostConfig or None if not found
         """
         self._ensure_loaded()
-        return self._hosts.get(name.lower())
+        return self._get_built(_host_lookup_key(name))
 
     def list_hosts(self) -> list[str]:
         """
@@ -194,7 +482,7 @@ class SSHHostConfigManager:
             List of host names
         """
         self._ensure_loaded()
-        return list(self._hosts.keys())
+        return list(self._raw.keys())
 
     def add_host(self, config: SSHHostConfig) -> None:
         """
@@ -204,7 +492,9 @@ class SSHHostConfigManager:
             config: Host configuration to add
         """
         self._ensure_loaded()
-        self._hosts[config.name.lower()] = config
+        key = _host_lookup_key(config.name)
+        self._raw[key] = (config.name, None)
+        self._built[key] = config
 
     def remove_host(self, name: str) -> bool:
         """
@@ -217,9 +507,10 @@ class SSHHostConfigManager:
             True if removed, False if not found
         """
         self._ensure_loaded()
-        name_lower = name.lower()
-        if name_lower in self._hosts:
-            del self._hosts[name_lower]
+        name_lower = _host_lookup_key(name)
+        if name_lower in self._raw:
+            del self._raw[name_lower]
+            self._built.pop(name_lower, None)
             return True
         return False
 
@@ -234,21 +525,29 @@ class SSHHostConfigManager:
             True if host exists
         """
         self._ensure_loaded()
-        return name.lower() in self._hosts
+        return _host_lookup_key(name) in self._raw
+
+
+# Manager shared by get_host_config() calls (reset by invalidate_cache())
+_default_manager: Optional[SSHHostConfigManager] = None
 
 
 def get_host_config(name: str) -> Optional[SSHHostConfig]:
     """
     Convenience function to get a host configuration.
 
+    Loads the default config file once per process.
+
     Args:
         name: Host name
 
     Returns:
         SSHHostConfig or None
     """
-    manager = SSHHostConfigManager()
-    return manager.get_host(name)
+    global _default_manager
+    if _default_manager is None:
+        _default_manager = SSHHostConfigManager()
+    return _default_manager.get_host_fast(name)
 
 
 def create_example_config() -> str:
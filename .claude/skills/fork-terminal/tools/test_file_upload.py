@@ -29,12 +29,14 @@ def test_file_upload():
     print(f"\n📂 Working directory: {os.getcwd()}")
     print(f"📄 Testing with file: SKILL.md")
 
-    # Verify file exists
-    if not Path("SKILL.md").exists():
+    # Verify file exists (one stat gives both existence and size)
+    try:
+        st = os.stat("SKILL.md")
+    except FileNotFoundError:
         print("❌ SKILL.md not found in current directory")
         return False
 
-    print(f"✓ File exists ({Path('SKILL.md').stat().st_size} bytes)")
+    print(f"✓ File exists ({st.st_size} bytes)")
 
     # Create sandbox backend
     backend = SandboxBackend(verbose=True)